@@ -15,5 +15,13 @@ def run_classification_job(params: ClassificationJobParams) -> None:
         limit=params.limit,
         skip_already_classified=params.skip_already_classified,
         only_valid_calls=params.only_valid_calls,
+        concurrency=params.concurrency,
+        batch_size=params.batch_size,
+        batch_token_budget=params.batch_token_budget,
     )
-    asyncio.run(pipeline.run())
+    if params.retry_dead_letters:
+        asyncio.run(pipeline.run_dead_letters())
+    elif params.incremental:
+        asyncio.run(pipeline.run_change_feed(once=True))
+    else:
+        asyncio.run(pipeline.run())
@@ -1,15 +1,28 @@
 """Batch classify Cosmos transcriptions with Microsoft Agent Framework."""
 
+import argparse
 import asyncio
+import hashlib
 import json
 import logging
 import os
+import sys
+import time
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
-from uuid import uuid4
+from functools import cached_property
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 
 from azure.cosmos import PartitionKey
 from azure.cosmos.aio import CosmosClient
+from azure.core import MatchConditions
+from azure.cosmos.exceptions import (
+    CosmosAccessConditionFailedError,
+    CosmosBatchOperationError,
+    CosmosHttpResponseError,
+    CosmosResourceNotFoundError,
+)
 from azure.identity.aio import AzureCliCredential, DefaultAzureCredential
 try:
     import agent_framework as _agent_framework_pkg
@@ -34,10 +47,43 @@ except ImportError as exc:  # pragma: no cover - defensive guard for missing dep
 
 from dotenv import find_dotenv, load_dotenv
 
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from app.minhash import MinHashIndex
+from app.preclassifier import LocalPreClassifier
+from app.ratelimit import is_rate_limit_error, is_transient_error, parse_retry_after
+from app.router import DeploymentRouter
+from app.tokens import count_tokens
+
 
 load_dotenv(find_dotenv())
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
 
+CLASSIFICATION_METADATA_FIELDS = (
+    "classification",
+    "classification_confidence",
+    "classification_reason",
+    "classification_next_action",
+    "classification_ts_utc",
+)
+# Cosmos DB accepts at most 10 operations in one patch request and 100 operations in one batch.
+PATCH_OPERATIONS_PER_REQUEST = 10
+PATCH_OPERATIONS_PER_BATCH = PATCH_OPERATIONS_PER_REQUEST * 100
+# Transactional batches take at most 100 operations and 2 MB of payload; keep headroom for the envelope.
+BATCH_MAX_OPERATIONS = 100
+BATCH_MAX_BYTES = 1_800_000
+_INVALID_ID_CHARACTERS = str.maketrans({character: "_" for character in "/\\?#"})
+
+
+class ClassificationResponseError(RuntimeError):
+    """The agent answered, but the answer is not a usable classification."""
+
+    def __init__(self, message: str, raw_response: Optional[str] = None) -> None:
+        super().__init__(message)
+        self.raw_response = raw_response
+
 
 class CosmosTranscriptionRepository:
     """Utility to stream and update transcription documents from Cosmos DB."""
@@ -53,10 +99,21 @@ class CosmosTranscriptionRepository:
         if partition_key and not partition_key.startswith("/"):
             partition_key = f"/{partition_key}"
         self.classification_partition_key = partition_key or "/parent_document_id"
+        self.lease_container_name = os.getenv(
+            "COSMOS_CLASSIFICATION_LEASE_CONTAINER", "classification_leases"
+        )
+        self.dead_letter_container_name = os.getenv(
+            "COSMOS_CLASSIFICATION_DEAD_LETTER_CONTAINER", "classification_dead_letters"
+        )
         self.cosmos_key = os.getenv("COSMOS_KEY", "")
         self.use_aad_auth = self._should_use_aad_auth()
         self._aad_credential: Optional[DefaultAzureCredential] = None
         self._classification_container_ready = False
+        self._dead_letter_container_ready = False
+        self.change_feed_continuation: Optional[str] = None
+        self.patch_max_attempts = int(os.getenv("COSMOS_PATCH_MAX_ATTEMPTS", "5"))
+        self._shared_client: Optional[CosmosClient] = None
+        self._shared_client_lock = asyncio.Lock()
 
     def _should_use_aad_auth(self) -> bool:
         flag = os.getenv("COSMOS_USE_AAD", "")
@@ -85,6 +142,230 @@ class CosmosTranscriptionRepository:
             async for document in container.read_all_items():
                 yield document
 
+    async def iter_pending_transcriptions(
+        self,
+        *,
+        manager_name: Optional[str] = None,
+        specialist_name: Optional[str] = None,
+        only_valid_calls: bool = True,
+        skip_already_classified: bool = False,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream one row per transcription to classify, filtered and projected server side."""
+        conditions: List[str] = []
+        parameters: List[Dict[str, Any]] = []
+        if manager_name:
+            conditions.append("STRINGEQUALS(c.name, @manager_name, true)")
+            parameters.append({"name": "@manager_name", "value": manager_name})
+        if specialist_name:
+            conditions.append("STRINGEQUALS(a.name, @specialist_name, true)")
+            parameters.append({"name": "@specialist_name", "value": specialist_name})
+        if only_valid_calls:
+            conditions.append("t.is_valid_call = 'YES'")
+        if skip_already_classified:
+            conditions.append(
+                "(NOT IS_DEFINED(t.metadata.classification)"
+                " OR IS_NULL(t.metadata.classification)"
+                " OR t.metadata.classification = '')"
+            )
+        query = (
+            "SELECT c.id AS document_id, c.name AS manager_name, a.name AS specialist_name,"
+            " t.id AS transcription_id, t.filename, t.transcription, t.is_valid_call"
+            " FROM c JOIN a IN c.assistants JOIN t IN a.transcriptions"
+        )
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        async with self._get_cosmos_client() as client:
+            database = client.get_database_client(self.database_name)
+            container = database.get_container_client(self.container_name)
+            async for row in container.query_items(query=query, parameters=parameters):
+                yield row
+
+    async def _get_shared_container(self, container_name: Optional[str] = None):
+        """Container client on a CosmosClient kept open until ``close``."""
+        async with self._shared_client_lock:
+            if self._shared_client is None:
+                client = self._get_cosmos_client()
+                await client.__aenter__()
+                self._shared_client = client
+        database = self._shared_client.get_database_client(self.database_name)
+        return database.get_container_client(container_name or self.container_name)
+
+    async def patch_transcription_metadata(
+        self, document_id: str, updates: List[Tuple[str, Dict[str, Any]]]
+    ) -> None:
+        """Write classification metadata with transactional batches of patch operations.
+
+        ``updates`` holds (specialist name, transcription) pairs. Transcriptions are located by
+        id, falling back to filename, and only their ``metadata.classification*`` paths are set.
+        Patch operations are grouped ten per patch and up to a hundred patches per batch; the
+        first patch of a batch is conditioned on the document ETag and the batch is atomic.
+        When the document changed in between (for example a new transcript was appended), the
+        whole update is rebuilt from a fresh read and sent again.
+        """
+        container = await self._get_shared_container()
+        for attempt in range(1, self.patch_max_attempts + 1):
+            try:
+                document = await container.read_item(item=document_id, partition_key=document_id)
+            except CosmosResourceNotFoundError:
+                logging.warning("Manager document %s disappeared before classification was saved", document_id)
+                return
+            operations = self._build_metadata_patch(document, updates)
+            if not operations:
+                return
+            etag = document.get("_etag")
+            try:
+                for start in range(0, len(operations), PATCH_OPERATIONS_PER_BATCH):
+                    chunk = operations[start : start + PATCH_OPERATIONS_PER_BATCH]
+                    batch_operations = [
+                        (
+                            "patch",
+                            (document_id, chunk[offset : offset + PATCH_OPERATIONS_PER_REQUEST]),
+                            {"if_match_etag": etag} if offset == 0 else {},
+                        )
+                        for offset in range(0, len(chunk), PATCH_OPERATIONS_PER_REQUEST)
+                    ]
+                    results = await container.execute_item_batch(
+                        batch_operations=batch_operations, partition_key=document_id
+                    )
+                    etag = results[-1].get("eTag")
+                return
+            except (CosmosAccessConditionFailedError, CosmosBatchOperationError) as exc:
+                if exc.status_code != 412:
+                    raise
+                logging.info(
+                    "Manager document %s changed while saving classifications (attempt %s/%s)",
+                    document_id,
+                    attempt,
+                    self.patch_max_attempts,
+                )
+        raise RuntimeError(
+            f"Could not save classifications for manager document {document_id} after"
+            f" {self.patch_max_attempts} conflicting writes"
+        )
+
+    @staticmethod
+    def _build_metadata_patch(
+        document: Dict[str, Any], updates: List[Tuple[str, Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        pending = {
+            (specialist_name, transcription.get("id") or transcription.get("filename")): transcription
+            for specialist_name, transcription in updates
+        }
+        operations: List[Dict[str, Any]] = []
+        for assistant_index, assistant in enumerate(document.get("assistants", [])):
+            for index, transcription in enumerate(assistant.get("transcriptions", [])):
+                key = (assistant.get("name"), transcription.get("id") or transcription.get("filename"))
+                update = pending.get(key)
+                if update is None:
+                    continue
+                path = f"/assistants/{assistant_index}/transcriptions/{index}/metadata"
+                values = {
+                    name: update.get("metadata", {}).get(name)
+                    for name in CLASSIFICATION_METADATA_FIELDS
+                }
+                if isinstance(transcription.get("metadata"), dict):
+                    operations.extend(
+                        {"op": "set", "path": f"{path}/{name}", "value": value}
+                        for name, value in values.items()
+                    )
+                else:
+                    operations.append({"op": "set", "path": path, "value": values})
+        return operations
+
+    async def iter_classification_records(self) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the fields of stored classification records needed to train local models."""
+        query = (
+            "SELECT c.id, c.transcription_id, c.filename, c.transcription, c.classification,"
+            " c.classification_ts_utc FROM c WHERE IS_DEFINED(c.transcription)"
+        )
+        async with self._get_cosmos_client() as client:
+            database = client.get_database_client(self.database_name)
+            container = database.get_container_client(self.classification_container_name)
+            async for record in container.query_items(query=query):
+                yield record
+
+    async def iter_classification_partitions(self) -> AsyncIterator[Any]:
+        """Stream the distinct partition key values of the classification records."""
+        path = "".join(f'["{part}"]' for part in self.classification_partition_key.strip("/").split("/"))
+        container = await self._get_shared_container(self.classification_container_name)
+        async for value in container.query_items(query=f"SELECT DISTINCT VALUE c{path} FROM c"):
+            yield value
+
+    async def iter_classification_record_keys(
+        self, partition_value: Any = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream the identity, timestamps and partition key of classification records.
+
+        With ``partition_value`` only the records of that partition are read.
+        """
+        fields = [
+            "id",
+            "parent_document_id",
+            "transcription_id",
+            "filename",
+            "classification_ts_utc",
+            "created_at_utc",
+        ]
+        partition_field = self.classification_partition_key.strip("/").split("/")[0]
+        if partition_field not in fields:
+            fields.append(partition_field)
+        query = "SELECT " + ", ".join(f'c["{name}"]' for name in fields) + " FROM c"
+        container = await self._get_shared_container(self.classification_container_name)
+        options = {"partition_key": partition_value} if partition_value is not None else {}
+        async for record in container.query_items(query=query, **options):
+            yield record
+
+    async def iter_changed_documents(
+        self, continuation: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream manager documents changed since ``continuation`` (or since the beginning).
+
+        Once the iterator is exhausted, ``change_feed_continuation`` holds the token to resume from.
+        """
+        async with self._get_cosmos_client() as client:
+            database = client.get_database_client(self.database_name)
+            container = database.get_container_client(self.container_name)
+            if continuation:
+                changes = container.query_items_change_feed(continuation=continuation)
+            else:
+                changes = container.query_items_change_feed(start_time="Beginning")
+            async for document in changes:
+                yield document
+            self.change_feed_continuation = (
+                container.client_connection.last_response_headers.get("etag") or continuation
+            )
+
+    async def _get_lease_container(self, client: CosmosClient):
+        database = client.get_database_client(self.database_name)
+        return await database.create_container_if_not_exists(
+            id=self.lease_container_name,
+            partition_key=PartitionKey(path="/id"),
+        )
+
+    async def load_change_feed_checkpoint(self, name: str) -> Optional[str]:
+        async with self._get_cosmos_client() as client:
+            container = await self._get_lease_container(client)
+            try:
+                lease = await container.read_item(item=name, partition_key=name)
+            except CosmosResourceNotFoundError:
+                return None
+            return lease.get("continuation")
+
+    async def save_change_feed_checkpoint(self, name: str, continuation: Optional[str]) -> None:
+        if not continuation:
+            return
+        async with self._get_cosmos_client() as client:
+            container = await self._get_lease_container(client)
+            await container.upsert_item(
+                body={
+                    "id": name,
+                    "source_container": self.container_name,
+                    "continuation": continuation,
+                    "updated_at_utc": datetime.now(timezone.utc).isoformat(),
+                }
+            )
+
     async def replace_document(self, document: Dict[str, Any]) -> None:
         async with self._get_cosmos_client() as client:
             database = client.get_database_client(self.database_name)
@@ -102,7 +383,7 @@ class CosmosTranscriptionRepository:
             )
         self._classification_container_ready = True
 
-    async def save_classification_record(
+    def build_classification_record(
         self,
         *,
         parent_document_id: str,
@@ -111,15 +392,22 @@ class CosmosTranscriptionRepository:
         transcription: Dict[str, Any],
         classification: Dict[str, Any],
         classification_ts_utc: str,
-    ) -> None:
+        classifier_version: str = "",
+    ) -> Dict[str, Any]:
+        """Build the record for one classification.
+
+        The id only depends on the transcript and the classifier version, so classifying the
+        same transcript again with the same classifier overwrites its record.
+        """
         base_identifier = (
             transcription.get("id")
             or transcription.get("filename")
             or transcription.get("transcription_id")
-            or uuid4().hex
+            or hashlib.sha256((transcription.get("transcription") or "").encode("utf-8")).hexdigest()[:16]
         )
-        logging.info("Saving classification record for transcription %s", base_identifier)
-        record_id = f"{parent_document_id}:{base_identifier}:{uuid4().hex}"
+        record_id = ":".join(
+            str(part) for part in (parent_document_id, base_identifier, classifier_version) if part
+        ).translate(_INVALID_ID_CHARACTERS)
         record = {
             "id": record_id,
             "parent_document_id": parent_document_id,
@@ -130,23 +418,421 @@ class CosmosTranscriptionRepository:
             "is_valid_call": transcription.get("is_valid_call"),
             "classification": classification,
             "classification_ts_utc": classification_ts_utc,
+            "classifier_version": classifier_version or None,
             "created_at_utc": datetime.now(timezone.utc).isoformat(),
         }
         transcript_text = transcription.get("transcription")
         if transcript_text:
             record["transcription"] = transcript_text
+        return record
 
+    async def save_classification_record(self, **kwargs: Any) -> None:
+        record = self.build_classification_record(**kwargs)
+        logging.info("Saving classification record %s", record["id"])
         await self._ensure_classification_container()
-        async with self._get_cosmos_client() as client:
-            database = client.get_database_client(self.database_name)
-            container = database.get_container_client(self.classification_container_name)
-            await container.upsert_item(body=record)
+        container = await self._get_shared_container(self.classification_container_name)
+        await container.upsert_item(body=record)
+
+    async def read_document(self, document_id: str) -> Optional[Dict[str, Any]]:
+        container = await self._get_shared_container()
+        try:
+            return await container.read_item(item=document_id, partition_key=document_id)
+        except CosmosResourceNotFoundError:
+            return None
+
+    @staticmethod
+    def dead_letter_id(document_id: str, transcription: Dict[str, Any]) -> str:
+        identifier = transcription.get("id") or transcription.get("filename") or "unknown"
+        return f"{document_id}:{identifier}".translate(_INVALID_ID_CHARACTERS)
+
+    async def _get_dead_letter_container(self):
+        container = await self._get_shared_container(self.dead_letter_container_name)
+        if not self._dead_letter_container_ready:
+            database = self._shared_client.get_database_client(self.database_name)
+            container = await database.create_container_if_not_exists(
+                id=self.dead_letter_container_name,
+                partition_key=PartitionKey(path="/id"),
+            )
+            self._dead_letter_container_ready = True
+        return container
+
+    async def record_dead_letter(
+        self,
+        *,
+        document_id: str,
+        manager_name: str,
+        specialist_name: str,
+        transcription: Dict[str, Any],
+        error: BaseException,
+        raw_response: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Upsert the failure of one transcript, counting how many times it has failed."""
+        container = await self._get_dead_letter_container()
+        dead_letter_id = self.dead_letter_id(document_id, transcription)
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            existing = await container.read_item(item=dead_letter_id, partition_key=dead_letter_id)
+        except CosmosResourceNotFoundError:
+            existing = {}
+        dead_letter = {
+            "id": dead_letter_id,
+            "document_id": document_id,
+            "manager_name": manager_name,
+            "specialist_name": specialist_name,
+            "transcription_id": transcription.get("id"),
+            "filename": transcription.get("filename"),
+            "error_type": type(error).__name__,
+            "error": str(error),
+            "raw_response": raw_response,
+            "attempts": existing.get("attempts", 0) + 1,
+            "first_failed_at_utc": existing.get("first_failed_at_utc", now),
+            "last_failed_at_utc": now,
+        }
+        await container.upsert_item(body=dead_letter)
+        return dead_letter
+
+    async def iter_dead_letters(
+        self,
+        *,
+        manager_name: Optional[str] = None,
+        specialist_name: Optional[str] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        conditions: List[str] = []
+        parameters: List[Dict[str, Any]] = []
+        if manager_name:
+            conditions.append("STRINGEQUALS(c.manager_name, @manager_name, true)")
+            parameters.append({"name": "@manager_name", "value": manager_name})
+        if specialist_name:
+            conditions.append("STRINGEQUALS(c.specialist_name, @specialist_name, true)")
+            parameters.append({"name": "@specialist_name", "value": specialist_name})
+        query = "SELECT * FROM c"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        container = await self._get_dead_letter_container()
+        async for dead_letter in container.query_items(query=query, parameters=parameters):
+            yield dead_letter
+
+    async def delete_dead_letter(self, dead_letter_id: str) -> None:
+        container = await self._get_dead_letter_container()
+        try:
+            await container.delete_item(item=dead_letter_id, partition_key=dead_letter_id)
+        except CosmosResourceNotFoundError:
+            pass
 
     async def close(self) -> None:
+        if self._shared_client:
+            await self._shared_client.__aexit__(None, None, None)
+            self._shared_client = None
         if self._aad_credential:
             await self._aad_credential.close()
 
 
+class ClassificationResultCache:
+    """Cosmos-backed cache of agent answers.
+
+    Entries are keyed by the transcript text and the classifier version (a hash of the
+    instructions, schemas and prompt template unless CALL_CLASSIFIER_VERSION pins it), so
+    editing the prompt invalidates every entry without touching the container. The deployment
+    is not part of the key, since any routed deployment may answer; the one that did is
+    stored with the entry. Change CALL_CLASSIFIER_VERSION when switching models.
+    """
+
+    def __init__(self, repository: CosmosTranscriptionRepository) -> None:
+        self.repository = repository
+        self.container_name = os.getenv(
+            "COSMOS_CLASSIFICATION_CACHE_CONTAINER", "classification_cache"
+        )
+        self._client: Optional[CosmosClient] = None
+        self._container = None
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def build_key(text: str, classifier_version: str) -> str:
+        text_hash = hashlib.sha256(text.strip().encode("utf-8")).hexdigest()
+        return hashlib.sha256(f"{classifier_version}|{text_hash}".encode("utf-8")).hexdigest()
+
+    async def _get_container(self):
+        async with self._lock:
+            if self._container is None:
+                self._client = self.repository._get_cosmos_client()
+                await self._client.__aenter__()
+                database = self._client.get_database_client(self.repository.database_name)
+                self._container = await database.create_container_if_not_exists(
+                    id=self.container_name,
+                    partition_key=PartitionKey(path="/id"),
+                )
+        return self._container
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        container = await self._get_container()
+        try:
+            item = await container.read_item(item=key, partition_key=key)
+        except CosmosResourceNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return item.get("classification")
+
+    async def put(
+        self,
+        key: str,
+        classification: Dict[str, Any],
+        *,
+        classifier_version: str,
+        deployment_name: Optional[str],
+    ) -> None:
+        container = await self._get_container()
+        await container.upsert_item(
+            body={
+                "id": key,
+                "classifier_version": classifier_version,
+                "deployment_name": deployment_name,
+                "classification": classification,
+                "created_at_utc": datetime.now(timezone.utc).isoformat(),
+            }
+        )
+
+    async def close(self) -> None:
+        if self._client:
+            await self._client.__aexit__(None, None, None)
+        self._client = None
+        self._container = None
+
+
+class ClassificationRecordWriter:
+    """Buffers classification records and upserts them in per-partition transactional batches.
+
+    Full buffers are flushed in the background, so workers do not wait on Cosmos, with a cap
+    on concurrent flushes. Batches are sized by serialized bytes as well as operation count.
+    Throttled batches (429) are retried after the delay Cosmos asks for; any other batch
+    failure falls back to writing the operations one by one, so one bad record does not sink
+    its neighbours. ``flush`` waits for everything buffered so far and raises if a background
+    write failed, and ``close`` must run at shutdown.
+    """
+
+    def __init__(
+        self,
+        repository: CosmosTranscriptionRepository,
+        *,
+        buffer_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        max_attempts: int = 5,
+    ) -> None:
+        self.repository = repository
+        self.buffer_size = buffer_size or int(os.getenv("CLASSIFICATION_RECORD_BUFFER_SIZE", "100"))
+        self.max_attempts = max_attempts
+        self.partition_path = repository.classification_partition_key.strip("/").split("/")
+        self._semaphore = asyncio.Semaphore(
+            concurrency or int(os.getenv("CLASSIFICATION_RECORD_WRITE_CONCURRENCY", "4"))
+        )
+        self._buffer: List[Dict[str, Any]] = []
+        self._flushes: set[asyncio.Task] = set()
+        self._errors: List[BaseException] = []
+        self.written = 0
+        self.failed = 0
+
+    async def add(self, record: Dict[str, Any]) -> None:
+        self._buffer.append(record)
+        if len(self._buffer) >= self.buffer_size:
+            await self._schedule_flush()
+
+    async def flush(self) -> None:
+        await self._schedule_flush()
+        while self._flushes:
+            await asyncio.gather(*list(self._flushes), return_exceptions=True)
+        if self._errors:
+            errors, self._errors = self._errors, []
+            raise RuntimeError(
+                f"{len(errors)} classification record flush(es) failed, covering {self.failed} records"
+            ) from errors[0]
+
+    async def close(self) -> None:
+        await self.flush()
+
+    async def _schedule_flush(self) -> None:
+        records, self._buffer = self._buffer, []
+        if not records:
+            return
+        # Acquire the slot before spawning so a slow Cosmos applies backpressure to the workers.
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._write(records))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    def _partition_value(self, record: Dict[str, Any]) -> Any:
+        value: Any = record
+        for part in self.partition_path:
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+
+    async def delete(self, records: List[Dict[str, Any]]) -> None:
+        """Delete records, given at least their id and partition key, in per-partition batches.
+
+        A batch that fails because one record is already gone is retried item by item, and
+        records that no longer exist count as deleted.
+        """
+        async with self._semaphore:
+            await self._execute(records, "delete")
+        logging.info("Deleted %s classification records", len(records))
+
+    async def _write(self, records: List[Dict[str, Any]]) -> None:
+        failed_before = self.failed
+        try:
+            await self._execute(records, "upsert")
+            self.written += len(records)
+            logging.info("Saved %s classification records", len(records))
+        except Exception as exc:
+            self.written += len(records) - (self.failed - failed_before)
+            self._errors.append(exc)
+            logging.exception("Failed to save %s classification records", self.failed - failed_before)
+        finally:
+            self._semaphore.release()
+
+    async def _execute(self, records: List[Dict[str, Any]], operation: str) -> None:
+        await self.repository._ensure_classification_container()
+        container = await self.repository._get_shared_container(
+            self.repository.classification_container_name
+        )
+        by_partition: Dict[Any, List[Tuple[str, Tuple[Any, ...]]]] = {}
+        for record in records:
+            argument = record if operation == "upsert" else record["id"]
+            by_partition.setdefault(self._partition_value(record), []).append((operation, (argument,)))
+        results = await asyncio.gather(
+            *(
+                self._write_partition(container, partition_value, group)
+                for partition_value, operations in by_partition.items()
+                for group in self._batches(operations)
+            ),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            raise errors[0]
+
+    @staticmethod
+    def _batches(
+        operations: List[Tuple[str, Tuple[Any, ...]]]
+    ) -> Iterator[List[Tuple[str, Tuple[Any, ...]]]]:
+        group: List[Tuple[str, Tuple[Any, ...]]] = []
+        group_bytes = 0
+        for operation in operations:
+            size = len(json.dumps(operation[1][0], default=str).encode("utf-8"))
+            if group and (len(group) >= BATCH_MAX_OPERATIONS or group_bytes + size > BATCH_MAX_BYTES):
+                yield group
+                group, group_bytes = [], 0
+            group.append(operation)
+            group_bytes += size
+        if group:
+            yield group
+
+    @staticmethod
+    def _throttle_delay(exc: CosmosHttpResponseError) -> Optional[float]:
+        """Seconds Cosmos asked to wait, or None when the error is not throttling."""
+        if exc.status_code != 429:
+            return None
+        return float((exc.headers or {}).get("x-ms-retry-after-ms") or 1000) / 1000
+
+    async def _write_partition(
+        self, container, partition_value: Any, operations: List[Tuple[str, Tuple[Any, ...]]]
+    ) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                await container.execute_item_batch(batch_operations=operations, partition_key=partition_value)
+                return
+            except (CosmosBatchOperationError, CosmosHttpResponseError) as exc:
+                delay = self._throttle_delay(exc)
+                if delay is None or attempt >= self.max_attempts:
+                    logging.warning(
+                        "Batch of %s classification record operations failed (%s); writing them one by one",
+                        len(operations),
+                        exc.status_code,
+                    )
+                    break
+                logging.warning(
+                    "Classification records throttled (attempt %s/%s). Retrying in %.1fs",
+                    attempt,
+                    self.max_attempts,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+        results = await asyncio.gather(
+            *(self._write_item(container, partition_value, operation) for operation in operations),
+            return_exceptions=True,
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        self.failed += len(errors)
+        if errors:
+            raise errors[0]
+
+    async def _write_item(self, container, partition_value: Any, operation: Tuple[str, Tuple[Any, ...]]) -> None:
+        kind, (argument,) = operation
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                if kind == "upsert":
+                    await container.upsert_item(body=argument)
+                else:
+                    await container.delete_item(item=argument, partition_key=partition_value)
+                return
+            except CosmosResourceNotFoundError:
+                if kind == "upsert":
+                    raise
+                # Already gone, which is what the delete wanted.
+                return
+            except CosmosHttpResponseError as exc:
+                delay = self._throttle_delay(exc)
+                if delay is None or attempt >= self.max_attempts:
+                    raise
+                await asyncio.sleep(delay)
+
+
+@dataclass
+class AgentUsage:
+    """Prompt, cached and completion token totals across agent calls."""
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+    def record(self, response: Any) -> None:
+        prompt, cached, completion = self.extract(response)
+        self.calls += 1
+        self.prompt_tokens += prompt
+        self.cached_tokens += cached
+        self.completion_tokens += completion
+        logging.debug("Agent call used %s prompt (%s cached) and %s completion tokens", prompt, cached, completion)
+
+    @staticmethod
+    def extract(response: Any) -> Tuple[int, int, int]:
+        """Read token counts from an agent response, tolerating SDKs that omit some of them."""
+        usage = getattr(response, "usage_details", None)
+        prompt = getattr(usage, "input_token_count", None) or 0
+        completion = getattr(usage, "output_token_count", None) or 0
+        additional = getattr(usage, "additional_counts", None) or {}
+        cached = next((value for key, value in additional.items() if "cached" in key), 0)
+        if not cached:
+            raw_items = getattr(response, "raw_representation", None)
+            if not isinstance(raw_items, list):
+                raw_items = [raw_items]
+            for raw in raw_items:
+                raw = getattr(raw, "raw_representation", raw)
+                raw_usage = getattr(raw, "usage", None)
+                details = getattr(raw_usage, "prompt_token_details", None) or getattr(
+                    raw_usage, "prompt_tokens_details", None
+                )
+                cached = cached or getattr(details, "cached_tokens", None) or 0
+                if not prompt:
+                    prompt = getattr(raw_usage, "prompt_tokens", None) or 0
+                    completion = getattr(raw_usage, "completion_tokens", None) or 0
+        return int(prompt), int(cached), int(completion)
+
+
 class CallClassificationAgent:
     """Azure AI Agent wrapper configured for Cemex call classification."""
 
@@ -159,113 +845,359 @@ class CallClassificationAgent:
     }
     """.strip()
 
-    def __init__(self) -> None:
+    BATCH_RESPONSE_SCHEMA = """
+    [
+        {
+            "key": "transcript key exactly as given",
+            "label": "order_creation | order_modification | order_follow_up | other",
+            "confidence": 0.0-1.0,
+            "reason": "short sentence referencing the transcript",
+            "next_action": "automation_hint for downstream workflows"
+        }
+    ]
+    """.strip()
+
+    def __init__(self, result_cache: Optional[ClassificationResultCache] = None) -> None:
         self.agent_name = os.getenv("CALL_CLASSIFIER_AGENT_NAME", "CemexCallClassifier")
+        self.result_cache = result_cache
         self._credential: Optional[AzureCliCredential] = None
-        self._endpoint = os.getenv("AZURE_AI_PROJECT_ENDPOINT", "")
-        self._deployment_name = os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME", "")
-        self._client: Optional[AzureAIAgentClient] = None
+        self.router = DeploymentRouter.from_env()
+        self._started = False
         self.max_retries = int(os.getenv("CALL_CLASSIFIER_MAX_RETRIES", "5"))
         self.retry_backoff_seconds = float(os.getenv("CALL_CLASSIFIER_RETRY_BACKOFF", "5"))
+        self.deployment_cooldown_seconds = float(
+            os.getenv("CALL_CLASSIFIER_DEPLOYMENT_COOLDOWN", "30")
+        )
+        self.output_tokens_per_transcript = int(
+            os.getenv("CALL_CLASSIFIER_OUTPUT_TOKENS_PER_TRANSCRIPT", "150")
+        )
+        self.usage = AgentUsage()
+        self._version_override = os.getenv("CALL_CLASSIFIER_VERSION", "")
+
+    @cached_property
+    def classifier_version(self) -> str:
+        """Version stamped on classification records and cache keys.
+
+        Defaults to a hash of the prompt and the configured model deployments, so editing the
+        prompt or switching a deployment starts fresh; CALL_CLASSIFIER_VERSION pins it.
+        """
+        if self._version_override:
+            return self._version_override
+        models = ",".join(sorted({deployment.deployment_name for deployment in self.router.deployments}))
+        return hashlib.sha256(f"{self.prompt_version}|{models}".encode("utf-8")).hexdigest()[:16]
 
     async def __aenter__(self):
         self._credential = AzureCliCredential()
         await self._credential.__aenter__()
-        if not self._endpoint or not self._deployment_name:
-            raise RuntimeError(
-                "AZURE_AI_PROJECT_ENDPOINT and AZURE_AI_MODEL_DEPLOYMENT_NAME must be set for"
-                " the CallClassificationAgent."
+        for deployment in self.router.deployments:
+            if not deployment.endpoint or not deployment.deployment_name:
+                raise RuntimeError(
+                    "AZURE_AI_PROJECT_ENDPOINT and AZURE_AI_MODEL_DEPLOYMENT_NAME (or an endpoint"
+                    " and deployment per CALL_CLASSIFIER_DEPLOYMENTS entry) must be set for the"
+                    " CallClassificationAgent."
+                )
+            deployment.client = AzureAIAgentClient(
+                agent_name=self.agent_name,
+                project_endpoint=deployment.endpoint,
+                model_deployment_name=deployment.deployment_name,
+                async_credential=self._credential,
             )
-
-        self._client = AzureAIAgentClient(
-            agent_name=self.agent_name,
-            project_endpoint=self._endpoint,
-            model_deployment_name=self._deployment_name,
-            async_credential=self._credential,
-        )
-        await self._client.__aenter__()
+            await deployment.client.__aenter__()
+            deployment.chat_options = ChatOptions(
+                instructions=self._build_instructions(), model_id=deployment.deployment_name
+            )
+        if len(self.router.deployments) > 1:
+            logging.info(
+                "Routing agent requests across deployments: %s",
+                ", ".join(
+                    f"{deployment.name} (priority {deployment.priority})"
+                    for deployment in self.router.deployments
+                ),
+            )
+        self._started = True
         return self
 
     async def __aexit__(self, exc_type, exc, exc_tb):
-        if self._client:
-            await self._client.__aexit__(exc_type, exc, exc_tb)
+        for deployment in self.router.deployments:
+            if deployment.client:
+                await deployment.client.__aexit__(exc_type, exc, exc_tb)
+            deployment.client = None
         if self._credential:
             await self._credential.__aexit__(exc_type, exc, exc_tb)
-        self._client = None
+        self._started = False
 
     def _build_instructions(self) -> str:
-        return (
+        """Static prompt prefix shared byte for byte by every request.
+
+        Everything that does not depend on the transcript lives here, ahead of the variable
+        user message, so provider-side prompt caching can reuse it across calls.
+        """
+        sections = [
             "You are a quality control assistant for Cemex customer service calls in the United"
             " States. Analyze each transcript carefully, then classify the call intent using the"
             " allowed labels (order_creation, order_modification, order_cancelled, order_follow_up, other)."
-            " Output a compact JSON object that matches this schema exactly:"
-            f" {self.RESPONSE_SCHEMA}."
             " Assess whether the caller wanted to create a new order, modify an existing one, or"
             " follow up on a prior request. Use 'other' if the transcript is unrelated or lacks"
-            " enough context. Keep confidence between 0 and 1."
+            " enough context. Keep confidence between 0 and 1.",
+            "Context about the project: The goal is to automatically classify customer service"
+            " calls for Cemex USA to improve reporting accuracy and operational efficiency.",
+            "When the message holds a single transcript, return JSON that matches this schema"
+            " exactly (do not include extra text):\n"
+            f"{self.RESPONSE_SCHEMA}",
+            "When the message holds several transcripts, each introduced by '### Transcript <key>',"
+            " classify each one independently and return a JSON array with exactly one object per"
+            " transcript, using its key, that matches this schema exactly (do not include extra text):\n"
+            f"{self.BATCH_RESPONSE_SCHEMA}",
+        ]
+        if self._few_shot_text:
+            sections.append("Examples:\n" + self._few_shot_text)
+        return "\n\n".join(sections)
+
+    @cached_property
+    def _few_shot_text(self) -> str:
+        path = os.getenv("CALL_CLASSIFIER_FEW_SHOT_FILE", "")
+        if not path:
+            return ""
+        with open(path, encoding="utf-8") as handle:
+            examples = json.load(handle)
+        return "\n\n".join(
+            f"Transcript:\n{example['transcription'].strip()}\n"
+            f"Answer: {json.dumps(example['classification'], sort_keys=True)}"
+            for example in examples
         )
 
     async def classify(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        if not self._client:
+        if not self._started:
             raise RuntimeError(
                 "Agent not initialized. Use 'async with CallClassificationAgent()' before classifying."
             )
 
+        cache_key = self._cache_key(payload)
+        if cache_key:
+            cached = await self.result_cache.get(cache_key)
+            if cached is not None:
+                logging.info("Reusing cached classification for %s", payload.get("filename"))
+                return cached
+        return await self._classify_uncached(payload, cache_key)
+
+    async def _classify_uncached(
+        self, payload: Dict[str, Any], cache_key: Optional[str]
+    ) -> Dict[str, Any]:
         prompt = self._build_prompt(payload)
-        response = await self._run_with_retry(prompt)
+        response, deployment_name = await self._run_with_retry(prompt)
         output_text = self._ensure_text_response(response)
         cleaned_text = self._strip_markdown_fence(output_text)
         try:
-            return json.loads(cleaned_text)
+            classification = json.loads(cleaned_text)
         except json.JSONDecodeError as exc:
             logging.error("Agent response was not JSON: %s", output_text)
-            raise RuntimeError("Classification agent returned invalid JSON") from exc
+            raise ClassificationResponseError(
+                "Classification agent returned invalid JSON", raw_response=output_text
+            ) from exc
+        if not isinstance(classification, dict) or not classification.get("label"):
+            raise ClassificationResponseError(
+                "Classification agent returned JSON without a label", raw_response=output_text
+            )
+        await self._store_cached(cache_key, classification, deployment_name)
+        return classification
 
-    def _build_prompt(self, payload: Dict[str, Any]) -> str:
+    @cached_property
+    def prompt_version(self) -> str:
+        """Short hash of everything in the prompt that is not the transcript itself."""
+        template = "\n".join(
+            [
+                self._build_instructions(),
+                self.RESPONSE_SCHEMA,
+                self.BATCH_RESPONSE_SCHEMA,
+                self._build_prompt({}),
+                self._build_batch_prompt([], []),
+            ]
+        )
+        return hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+
+    def _cache_key(self, payload: Dict[str, Any]) -> Optional[str]:
+        if not self.result_cache:
+            return None
+        return ClassificationResultCache.build_key(
+            payload.get("transcription", ""), self.classifier_version
+        )
+
+    async def _store_cached(
+        self, cache_key: Optional[str], classification: Dict[str, Any], deployment_name: str
+    ) -> None:
+        if not cache_key or not isinstance(classification, dict) or not classification.get("label"):
+            return
+        await self.result_cache.put(
+            cache_key,
+            classification,
+            classifier_version=self.classifier_version,
+            deployment_name=deployment_name,
+        )
+
+    async def classify_batch(self, payloads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Classify several transcripts with one request.
+
+        Each transcript is sent under a stable key and the model answers with a JSON array
+        keyed the same way. Transcripts missing from the answer, or answered with something
+        that is not a classification, are classified again one at a time.
+        """
+        if len(payloads) == 1:
+            return [await self.classify(payloads[0])]
+        if not self._started:
+            raise RuntimeError(
+                "Agent not initialized. Use 'async with CallClassificationAgent()' before classifying."
+            )
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+        cache_keys = [self._cache_key(payload) for payload in payloads]
+        for index, cache_key in enumerate(cache_keys):
+            if cache_key:
+                results[index] = await self.result_cache.get(cache_key)
+        misses = [index for index, result in enumerate(results) if result is None]
+        if len(misses) < len(payloads):
+            logging.info(
+                "Reusing %s cached classifications from a batch of %s",
+                len(payloads) - len(misses),
+                len(payloads),
+            )
+        if len(misses) == 1:
+            results[misses[0]] = await self._classify_uncached(
+                payloads[misses[0]], cache_keys[misses[0]]
+            )
+            return results
+        if not misses:
+            return results
+
+        keys = [f"T{position + 1}" for position in range(len(misses))]
+        pending = [payloads[index] for index in misses]
+        response, deployment_name = await self._run_with_retry(
+            self._build_batch_prompt(keys, pending), transcripts=len(pending)
+        )
+        output_text = self._ensure_text_response(response)
+        by_key = self._parse_batch_response(self._strip_markdown_fence(output_text))
+
+        for key, index in zip(keys, misses):
+            classification = by_key.get(key)
+            if classification is None:
+                logging.warning(
+                    "Batch response had no valid classification for %s (%s). Retrying alone.",
+                    key,
+                    payloads[index].get("filename"),
+                )
+                classification = await self._classify_uncached(payloads[index], cache_keys[index])
+            else:
+                await self._store_cached(cache_keys[index], classification, deployment_name)
+            results[index] = classification
+        return results
+
+    def _parse_batch_response(self, text: str) -> Dict[str, Dict[str, Any]]:
+        try:
+            parsed = json.loads(text)
+        except json.JSONDecodeError:
+            logging.error("Agent batch response was not JSON: %s", text)
+            return {}
+        if isinstance(parsed, dict):
+            parsed = parsed.get("classifications") or parsed.get("results") or []
+        if not isinstance(parsed, list):
+            return {}
+        by_key: Dict[str, Dict[str, Any]] = {}
+        for item in parsed:
+            if not isinstance(item, dict) or not item.get("key") or not item.get("label"):
+                continue
+            classification = {name: value for name, value in item.items() if name != "key"}
+            by_key[str(item["key"]).strip()] = classification
+        return by_key
+
+    @staticmethod
+    def _format_transcript(payload: Dict[str, Any]) -> str:
         return (
-            "Context about the project: The goal is to automatically classify customer service"
-            " calls for Cemex USA to improve reporting accuracy and operational efficiency."
-            "\n\n"
-            "Return JSON that matches this schema exactly (do not include extra text):\n"
-            f"{self.RESPONSE_SCHEMA}\n\n"
-            "Transcript metadata:\n"
             f"Manager: {payload.get('manager_name', 'UNKNOWN')}\n"
             f"Specialist: {payload.get('specialist_name', 'UNKNOWN')}\n"
             f"Filename: {payload.get('filename')}\n"
             f"IsValidCall: {payload.get('is_valid_call')}\n"
             "Transcript:\n"
-            f"""{payload.get('transcription', '').strip()}"""
+            f"{payload.get('transcription', '').strip()}"
+        )
+
+    def _build_prompt(self, payload: Dict[str, Any]) -> str:
+        return "Transcript metadata:\n" + self._format_transcript(payload)
+
+    def _build_batch_prompt(self, keys: List[str], payloads: List[Dict[str, Any]]) -> str:
+        sections = [
+            f"### Transcript {key}\n" + self._format_transcript(payload)
+            for key, payload in zip(keys, payloads)
+        ]
+        sections.append(f"Return the JSON array for these {len(payloads)} transcripts.")
+        return "\n\n".join(sections)
+
+    @cached_property
+    def _instruction_tokens(self) -> int:
+        return count_tokens(self._build_instructions())
+
+    def estimate_request_tokens(self, prompt: str, transcripts: int = 1) -> int:
+        """Tokens a request counts against the deployment quota: prompt plus expected output."""
+        return (
+            self._instruction_tokens
+            + count_tokens(prompt)
+            + self.output_tokens_per_transcript * transcripts
         )
 
-    async def _run_with_retry(self, prompt: str) -> Any:
+    async def _run_with_retry(self, prompt: str, transcripts: int = 1) -> Tuple[Any, str]:
+        """Send the prompt to the best available deployment, spilling over when one fails.
+
+        Returns the response and the name of the deployment that produced it.
+
+        A throttled deployment is paused for the retry-after delay and a deployment that fails
+        with a 5xx or a timeout is taken out of rotation for the cooldown; the retry is routed
+        again, so it lands on another deployment whenever one has capacity. Any other error
+        (content filter, context length, bad request) is raised at once without touching the
+        deployment's health, since every deployment would reject the request the same way.
+        """
         attempt = 0
+        request_tokens = (
+            self.estimate_request_tokens(prompt, transcripts) if self.router.limited else 0
+        )
         while True:
+            deployment = self.router.choose(request_tokens)
+            await deployment.rate_limiter.acquire(request_tokens)
+            deployment.in_flight += 1
+            started = time.monotonic()
             try:
-                chat_options = ChatOptions(
-                    instructions=self._build_instructions(),
-                    model_id=self._deployment_name,
+                response = await deployment.client.get_response(
+                    prompt, chat_options=deployment.chat_options
                 )
-                return await self._client.get_response(prompt, chat_options=chat_options)
             except ServiceResponseException as exc:
                 attempt += 1
                 if not self._should_retry(exc, attempt):
                     raise
-                delay = self.retry_backoff_seconds * (2 ** (attempt - 1))
+                if is_rate_limit_error(str(exc)):
+                    delay = parse_retry_after(str(exc)) or self.retry_backoff_seconds * (
+                        2 ** (attempt - 1)
+                    )
+                    reason = "rate-limited"
+                else:
+                    delay = self.deployment_cooldown_seconds
+                    reason = f"failed ({exc})"
                 logging.warning(
-                    "Azure AI agent rate-limited (attempt %s/%s). Retrying in %.1fs",
+                    "Deployment %s %s (attempt %s/%s). Holding it back for %.1fs",
+                    deployment.name,
+                    reason,
                     attempt,
                     self.max_retries,
                     delay,
                 )
-                await asyncio.sleep(delay)
+                deployment.mark_unhealthy(delay)
+                continue
+            finally:
+                deployment.in_flight -= 1
+            deployment.record_latency(time.monotonic() - started)
+            self.usage.record(response)
+            return response, deployment.deployment_name
 
     def _should_retry(self, exc: ServiceResponseException, attempt: int) -> bool:
         if attempt >= self.max_retries:
             return False
-        message = str(exc).lower()
-        if "too many requests" in message or "429" in message:
-            return True
-        return False
+        return is_rate_limit_error(str(exc)) or is_transient_error(str(exc))
 
     def _ensure_text_response(self, agent_response: Any) -> str:
         if isinstance(agent_response, str):
@@ -322,8 +1254,42 @@ class CallClassificationAgent:
         return inner.strip()
 
 
+@dataclass
+class _DocumentState:
+    """Tracks the in-flight transcripts of one manager document."""
+
+    document_id: str
+    items: List["_WorkItem"] = field(default_factory=list)
+    pending: int = 0
+    changed: bool = False
+    sealed: bool = False
+    finished: bool = False
+
+
+@dataclass
+class _WorkItem:
+    """One transcript queued for classification."""
+
+    state: _DocumentState
+    manager_name: str
+    specialist_name: str
+    transcription: Dict[str, Any]
+    payload: Dict[str, Any]
+    tokens: int = 0
+
+
 class ClassificationPipeline:
-    """Coordinates Cosmos ingestion and per-transcription classification."""
+    """Coordinates Cosmos ingestion and per-transcription classification.
+
+    A reader queues the transcripts to classify (selected server side by a projected JOIN
+    query, or taken from manager documents read off the change feed), a pool of workers
+    classifies them concurrently, and a writer saves each manager document once all of its
+    queued transcripts have been classified. With a batch size above one, the
+    reader packs several transcripts into one agent request up to a token budget.
+
+    A transcript that cannot be classified is recorded in the dead-letter container and
+    the run carries on; ``run_dead_letters`` reprocesses only those transcripts.
+    """
 
     def __init__(
         self,
@@ -333,6 +1299,9 @@ class ClassificationPipeline:
         limit: Optional[int] = None,
         skip_already_classified: bool = False,
         only_valid_calls: bool = True,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        batch_token_budget: Optional[int] = None,
     ) -> None:
         self.repository = CosmosTranscriptionRepository()
         self.manager_filter = manager_name.strip().upper() if manager_name else None
@@ -342,36 +1311,339 @@ class ClassificationPipeline:
         self.limit = limit if limit and limit > 0 else None
         self.skip_already_classified = skip_already_classified
         self.only_valid_calls = only_valid_calls
+        self.concurrency = max(
+            1, concurrency or int(os.getenv("CALL_CLASSIFIER_CONCURRENCY", "8"))
+        )
+        self.batch_size = max(1, batch_size or int(os.getenv("CALL_CLASSIFIER_BATCH_SIZE", "1")))
+        self.batch_token_budget = batch_token_budget or int(
+            os.getenv("CALL_CLASSIFIER_BATCH_TOKEN_BUDGET", "6000")
+        )
+        self.result_cache = (
+            ClassificationResultCache(self.repository)
+            if os.getenv("CALL_CLASSIFIER_RESULT_CACHE", "true").lower() in {"1", "true", "yes"}
+            else None
+        )
+        self.record_writer = ClassificationRecordWriter(self.repository)
+        self.preclassifier = self._load_preclassifier()
+        self.duplicate_index_path = os.getenv("CALL_CLASSIFIER_MINHASH_INDEX", "")
+        self.duplicate_index = (
+            MinHashIndex.open(
+                self.duplicate_index_path,
+                threshold=float(os.getenv("CALL_CLASSIFIER_MINHASH_THRESHOLD", "0.9")),
+            )
+            if self.duplicate_index_path
+            else None
+        )
+        self._local_classified = 0
+        self._propagated = 0
+        self.dead_letter_max_attempts = int(os.getenv("CALL_CLASSIFIER_DEAD_LETTER_MAX_ATTEMPTS", "5"))
+        self._retrying_dead_letters = False
+        self._classifier_version = ""
         self._processed = 0
+        self._enqueued = 0
+        self._failed = 0
+
+    @staticmethod
+    def _load_preclassifier() -> Optional[LocalPreClassifier]:
+        model_path = os.getenv("CALL_CLASSIFIER_PRECLASSIFIER_MODEL", "")
+        if not model_path:
+            return None
+        if not os.path.exists(model_path):
+            logging.warning("Pre-classifier model %s not found. Every transcript goes to the agent.", model_path)
+            return None
+        threshold = os.getenv("CALL_CLASSIFIER_PRECLASSIFIER_THRESHOLD")
+        model = LocalPreClassifier.load(model_path, float(threshold) if threshold else None)
+        logging.info(
+            "Loaded pre-classifier %s (threshold %.3f, trained %s)",
+            model_path,
+            model.threshold,
+            model.report.get("trained_at_utc"),
+        )
+        return model
 
     async def run(self) -> int:
         try:
-            async with CallClassificationAgent() as classifier:
-                async for document in self.repository.iter_documents():
+            async with CallClassificationAgent(result_cache=self.result_cache) as classifier:
+                rows = self.repository.iter_pending_transcriptions(
+                    manager_name=self.manager_filter,
+                    specialist_name=self.specialist_filter,
+                    only_valid_calls=self.only_valid_calls,
+                    skip_already_classified=self.skip_already_classified,
+                )
+                await self._run_pass(classifier, self._rows_to_transcriptions(rows))
+                self._log_agent_stats(classifier)
+        finally:
+            await self._close()
+        return self._processed
+
+    async def run_change_feed(self, *, poll_seconds: float = 5.0, once: bool = False) -> int:
+        """Classify only documents changed since the stored checkpoint, optionally forever.
 
-                    updated, should_stop = await self._classify_document(document, classifier)
-                    if updated:
-                        await self.repository.replace_document(document)
-                    if should_stop:
+        The checkpoint is saved after every document of a pass has been written, so a crash
+        replays the last pass instead of losing it. Documents rewritten by this pipeline show
+        up again in the feed, but by then all their transcripts are classified and skipped.
+        """
+        self.skip_already_classified = True
+        if self.limit:
+            logging.warning("Ignoring limit=%s in change feed mode", self.limit)
+            self.limit = None
+        checkpoint_name = f"classification:{self.repository.container_name}"
+        try:
+            async with CallClassificationAgent(result_cache=self.result_cache) as classifier:
+                while True:
+                    continuation = await self.repository.load_change_feed_checkpoint(checkpoint_name)
+                    processed_before = self._processed
+                    documents = self.repository.iter_changed_documents(continuation)
+                    await self._run_pass(classifier, self._documents_to_transcriptions(documents))
+                    await self.repository.save_change_feed_checkpoint(
+                        checkpoint_name, self.repository.change_feed_continuation
+                    )
+                    if self._processed > processed_before:
+                        logging.info(
+                            "Change feed pass classified %s transcripts",
+                            self._processed - processed_before,
+                        )
+                    if once:
                         break
+                    await asyncio.sleep(poll_seconds)
+                self._log_agent_stats(classifier)
+        finally:
+            await self._close()
+        return self._processed
+
+    async def run_dead_letters(self) -> int:
+        """Classify again only the transcripts recorded in the dead-letter container.
+
+        Dead letters are removed once their manager document has been saved. Entries that
+        already failed ``dead_letter_max_attempts`` times are left for manual review.
+        """
+        self._retrying_dead_letters = True
+        try:
+            async with CallClassificationAgent(result_cache=self.result_cache) as classifier:
+                await self._run_pass(classifier, self._dead_letters_to_transcriptions())
+                self._log_agent_stats(classifier)
         finally:
-            await self.repository.close()
+            await self._close()
         return self._processed
 
+    async def _dead_letters_to_transcriptions(
+        self,
+    ) -> AsyncIterator[Tuple[str, str, str, Dict[str, Any]]]:
+        by_document: Dict[str, List[Dict[str, Any]]] = {}
+        async for dead_letter in self.repository.iter_dead_letters(
+            manager_name=self.manager_filter, specialist_name=self.specialist_filter
+        ):
+            if dead_letter.get("attempts", 0) >= self.dead_letter_max_attempts:
+                logging.warning(
+                    "Leaving dead letter %s after %s failed attempts: %s",
+                    dead_letter["id"],
+                    dead_letter["attempts"],
+                    dead_letter.get("error"),
+                )
+                continue
+            by_document.setdefault(dead_letter["document_id"], []).append(dead_letter)
+        logging.info(
+            "Retrying %s dead-lettered transcripts from %s documents",
+            sum(len(dead_letters) for dead_letters in by_document.values()),
+            len(by_document),
+        )
+
+        for document_id, dead_letters in by_document.items():
+            document = await self.repository.read_document(document_id)
+            wanted = {dead_letter["id"] for dead_letter in dead_letters}
+            for assistant in (document or {}).get("assistants", []):
+                for transcription in assistant.get("transcriptions", []):
+                    dead_letter_id = self.repository.dead_letter_id(document_id, transcription)
+                    if dead_letter_id not in wanted:
+                        continue
+                    wanted.discard(dead_letter_id)
+                    if (transcription.get("metadata") or {}).get("classification"):
+                        logging.info("Dead letter %s was classified since. Removing it.", dead_letter_id)
+                        await self.repository.delete_dead_letter(dead_letter_id)
+                        continue
+                    yield (
+                        document_id,
+                        document.get("name", "UNKNOWN"),
+                        assistant.get("name", "UNKNOWN"),
+                        transcription,
+                    )
+            for dead_letter_id in wanted:
+                logging.warning("Transcript of dead letter %s no longer exists. Removing it.", dead_letter_id)
+                await self.repository.delete_dead_letter(dead_letter_id)
+
+    async def _run_pass(
+        self,
+        classifier: "CallClassificationAgent",
+        transcriptions: AsyncIterator[Tuple[str, str, str, Dict[str, Any]]],
+    ) -> None:
+        self._classifier_version = classifier.classifier_version
+        work_queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        write_queue: asyncio.Queue = asyncio.Queue()
+        async with asyncio.TaskGroup() as group:
+            workers = [
+                group.create_task(self._classify_worker(classifier, work_queue, write_queue))
+                for _ in range(self.concurrency)
+            ]
+            writer = group.create_task(self._document_writer(write_queue))
+            await self._read_transcriptions(transcriptions, work_queue, write_queue)
+            for _ in workers:
+                await work_queue.put(None)
+            await asyncio.gather(*workers)
+            await write_queue.put(None)
+            await writer
+        await self.record_writer.flush()
+        if self.duplicate_index is not None and self.duplicate_index.dirty:
+            self.duplicate_index.save(self.duplicate_index_path)
+
+    @staticmethod
+    def _log_agent_stats(classifier: "CallClassificationAgent") -> None:
+        usage = classifier.usage
+        if usage.calls:
+            logging.info(
+                "Agent calls: %s, prompt tokens: %s (%s cached, %.1f%% hit rate), completion tokens: %s",
+                usage.calls,
+                usage.prompt_tokens,
+                usage.cached_tokens,
+                usage.cache_hit_rate * 100,
+                usage.completion_tokens,
+            )
+        for deployment in classifier.router.deployments:
+            if deployment.calls or deployment.failures:
+                logging.info(
+                    "Deployment %s: %s calls, %s failures, latency EWMA %.2fs",
+                    deployment.name,
+                    deployment.calls,
+                    deployment.failures,
+                    deployment.latency_ewma or 0.0,
+                )
+            if deployment.rate_limiter.enabled:
+                logging.info(
+                    "Waited %.1fs on the %s rate limiter",
+                    deployment.rate_limiter.waited_seconds,
+                    deployment.name,
+                )
+
+    async def _close(self) -> None:
+        if self.preclassifier:
+            logging.info(
+                "Pre-classifier labelled %s of %s transcripts without the agent",
+                self._local_classified,
+                self._processed,
+            )
+        if self.duplicate_index is not None:
+            logging.info(
+                "Reused %s classifications for near-duplicate transcripts (index size %s)",
+                self._propagated,
+                len(self.duplicate_index),
+            )
+        if self._failed:
+            logging.warning(
+                "%s transcripts failed and were written to the %s container",
+                self._failed,
+                self.repository.dead_letter_container_name,
+            )
+        try:
+            await self.record_writer.close()
+        except Exception:  # pragma: no cover - keep closing the clients
+            logging.exception("Failed to flush buffered classification records")
+        if self.result_cache:
+            logging.info(
+                "Classification cache: %s hits, %s misses",
+                self.result_cache.hits,
+                self.result_cache.misses,
+            )
+            await self.result_cache.close()
+        await self.repository.close()
+
     def _limit_reached(self) -> bool:
-        return self.limit is not None and self._processed >= self.limit
+        return self.limit is not None and self._enqueued >= self.limit
+
+    async def _documents_to_transcriptions(
+        self, documents: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[str, str, str, Dict[str, Any]]]:
+        async for document in documents:
+            document_id = str(document.get("id") or document.get("name"))
+            for manager_name, specialist_name, transcription in self._iter_pending_transcriptions(document):
+                yield document_id, manager_name, specialist_name, transcription
+
+    @staticmethod
+    async def _rows_to_transcriptions(
+        rows: AsyncIterator[Dict[str, Any]]
+    ) -> AsyncIterator[Tuple[str, str, str, Dict[str, Any]]]:
+        async for row in rows:
+            transcription = {
+                "id": row.get("transcription_id"),
+                "filename": row.get("filename"),
+                "transcription": row.get("transcription") or "",
+                "is_valid_call": row.get("is_valid_call"),
+                "metadata": {},
+            }
+            yield (
+                str(row["document_id"]),
+                row.get("manager_name", "UNKNOWN"),
+                row.get("specialist_name", "UNKNOWN"),
+                transcription,
+            )
+
+    async def _read_transcriptions(
+        self,
+        transcriptions: AsyncIterator[Tuple[str, str, str, Dict[str, Any]]],
+        work_queue: asyncio.Queue,
+        write_queue: asyncio.Queue,
+    ) -> None:
+        batch: List[_WorkItem] = []
+        batch_tokens = 0
+        state: Optional[_DocumentState] = None
+        async for document_id, manager_name, specialist_name, transcription in transcriptions:
+            if state is None or state.document_id != document_id:
+                if state is not None:
+                    state.sealed = True
+                    await self._finish_if_done(state, write_queue)
+                state = _DocumentState(document_id=document_id)
+            item = self._build_work_item(state, manager_name, specialist_name, transcription)
+            if batch and (
+                len(batch) >= self.batch_size
+                or batch_tokens + item.tokens > self.batch_token_budget
+            ):
+                await work_queue.put(batch)
+                batch, batch_tokens = [], 0
+            state.pending += 1
+            self._enqueued += 1
+            batch.append(item)
+            batch_tokens += item.tokens
+            if self._limit_reached():
+                break
+        if state is not None:
+            state.sealed = True
+            await self._finish_if_done(state, write_queue)
+        if batch:
+            await work_queue.put(batch)
 
-    async def _classify_document(
-        self, document: Dict[str, Any], classifier: CallClassificationAgent
-    ) -> Tuple[bool, bool]:
-        changed = False
+    def _build_work_item(
+        self,
+        state: _DocumentState,
+        manager_name: str,
+        specialist_name: str,
+        transcription: Dict[str, Any],
+    ) -> _WorkItem:
+        payload = {
+            "manager_name": manager_name,
+            "specialist_name": specialist_name,
+            "filename": transcription.get("filename") or transcription.get("id"),
+            "transcription": transcription.get("transcription", ""),
+            "is_valid_call": transcription.get("is_valid_call"),
+        }
+        tokens = count_tokens(payload["transcription"]) if self.batch_size > 1 else 0
+        return _WorkItem(state, manager_name, specialist_name, transcription, payload, tokens)
+
+    def _iter_pending_transcriptions(
+        self, document: Dict[str, Any]
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
         manager_name = document.get("name", "UNKNOWN")
         manager_key = str(manager_name).upper()
         if self.manager_filter and manager_key != self.manager_filter:
-            return False, False
-        parent_document_id = str(document.get("id") or manager_name)
+            return
         assistants: List[Dict[str, Any]] = document.get("assistants", [])
-        should_stop = False
 
         for assistant in assistants:
             specialist_name = assistant.get("name", "UNKNOWN")
@@ -396,57 +1668,242 @@ class ClassificationPipeline:
                         transcription.get("filename") or transcription.get("id"),
                     )
                     continue
+                yield manager_name, specialist_name, transcription
 
-                payload = {
-                    "manager_name": manager_name,
-                    "specialist_name": specialist_name,
-                    "filename": transcription.get("filename") or transcription.get("id"),
-                    "transcription": transcription.get("transcription", ""),
-                    "is_valid_call": transcription.get("is_valid_call"),
-                }
+    async def _classify_worker(
+        self,
+        classifier: CallClassificationAgent,
+        work_queue: asyncio.Queue,
+        write_queue: asyncio.Queue,
+    ) -> None:
+        while True:
+            batch = await work_queue.get()
+            if batch is None:
+                return
+            for item in batch:
                 logging.info(
                     "Classifying %s/%s (%s)",
-                    manager_name,
-                    specialist_name,
-                    payload["filename"],
+                    item.manager_name,
+                    item.specialist_name,
+                    item.payload["filename"],
                 )
-                classification = await classifier.classify(payload)
-                classification_ts = datetime.now(timezone.utc).isoformat()
-                metadata["classification"] = classification.get("label")
-                metadata["classification_confidence"] = classification.get("confidence")
-                metadata["classification_reason"] = classification.get("reason")
-                metadata["classification_next_action"] = classification.get("next_action")
-                metadata["classification_ts_utc"] = classification_ts
-                transcription["metadata"] = metadata
-                changed = True
-                self._processed += 1
-                await self.repository.save_classification_record(
-                    parent_document_id=parent_document_id,
-                    manager_name=manager_name,
-                    specialist_name=specialist_name,
-                    transcription=transcription,
-                    classification=classification,
-                    classification_ts_utc=classification_ts,
+            classifications = await self._classify_isolated(classifier, batch)
+            for item, classification in zip(batch, classifications):
+                if classification is not None:
+                    await self._apply_classification(item, classification)
+                    item.state.items.append(item)
+                    item.state.changed = True
+                item.state.pending -= 1
+                await self._finish_if_done(item.state, write_queue)
+
+    async def _classify_isolated(
+        self, classifier: CallClassificationAgent, batch: List[_WorkItem]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Classify a batch, splitting it on failure so only the failing transcripts are lost.
+
+        Failed transcripts are dead-lettered and come back as None.
+        """
+        try:
+            return await self._classify_batch(classifier, batch)
+        except Exception as exc:
+            if len(batch) == 1:
+                await self._dead_letter(batch[0], exc)
+                return [None]
+            logging.warning(
+                "Batch of %s transcripts failed (%s). Classifying them one at a time.",
+                len(batch),
+                exc,
+            )
+        results: List[Optional[Dict[str, Any]]] = []
+        for item in batch:
+            results.extend(await self._classify_isolated(classifier, [item]))
+        return results
+
+    async def _dead_letter(self, item: _WorkItem, error: Exception) -> None:
+        self._failed += 1
+        logging.error(
+            "Failed to classify %s/%s (%s): %s",
+            item.manager_name,
+            item.specialist_name,
+            item.payload["filename"],
+            error,
+        )
+        try:
+            await self.repository.record_dead_letter(
+                document_id=item.state.document_id,
+                manager_name=item.manager_name,
+                specialist_name=item.specialist_name,
+                transcription=item.transcription,
+                error=error,
+                raw_response=getattr(error, "raw_response", None),
+            )
+        except Exception:
+            logging.exception("Failed to record dead letter for %s", item.payload["filename"])
+
+    async def _classify_batch(
+        self, classifier: CallClassificationAgent, batch: List[_WorkItem]
+    ) -> List[Dict[str, Any]]:
+        """Resolve each transcript through the cheapest tier that is confident about it.
+
+        Near-duplicates of transcripts the agent classified with the same classifier version
+        reuse their label (a transcript never matches its own earlier entry), confident
+        transcripts are labelled by the local pre-classifier, and only the rest reach the agent.
+        """
+        payloads = [item.payload for item in batch]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+        if self.duplicate_index is not None:
+            for index, payload in enumerate(payloads):
+                results[index] = self.duplicate_index.query(
+                    payload["transcription"],
+                    classifier_version=classifier.classifier_version,
+                    exclude_key=str(payload["filename"]),
                 )
-                logging.info(
-                    "Classified %s/%s (%s) as %s",
-                    manager_name,
-                    specialist_name,
-                    transcription.get("filename"),
-                    metadata["classification"],
+                if results[index] is not None:
+                    self._propagated += 1
+                    logging.info(
+                        "Reusing classification of %s for near-duplicate %s (similarity %.2f)",
+                        results[index]["propagated_from"],
+                        payload["filename"],
+                        results[index]["similarity"],
+                    )
+        if self.preclassifier:
+            pending = [index for index, result in enumerate(results) if result is None]
+            local = self.preclassifier.predict([payloads[index]["transcription"] for index in pending])
+            for index, result in zip(pending, local):
+                results[index] = result
+            self._local_classified += sum(result is not None for result in local)
+        escalated = [index for index, result in enumerate(results) if result is None]
+        if escalated:
+            answers = await classifier.classify_batch([payloads[index] for index in escalated])
+            for index, answer in zip(escalated, answers):
+                results[index] = answer
+                if self.duplicate_index is not None and answer.get("label") and not answer.get("source"):
+                    self.duplicate_index.add(
+                        str(payloads[index]["filename"]),
+                        payloads[index]["transcription"],
+                        answer,
+                        classifier_version=classifier.classifier_version,
+                    )
+        return results
+
+    async def _finish_if_done(self, state: _DocumentState, write_queue: asyncio.Queue) -> None:
+        if state.sealed and state.pending == 0 and not state.finished:
+            state.finished = True
+            if state.changed:
+                await write_queue.put(state)
+
+    async def _document_writer(self, write_queue: asyncio.Queue) -> None:
+        while True:
+            state = await write_queue.get()
+            if state is None:
+                return
+            try:
+                await self.repository.patch_transcription_metadata(
+                    state.document_id,
+                    [(item.specialist_name, item.transcription) for item in state.items],
                 )
-                if self._limit_reached():
-                    should_stop = True
-                    break
-            if should_stop:
-                break
+            except Exception as exc:
+                logging.exception("Failed to save classifications of document %s", state.document_id)
+                for item in state.items:
+                    await self._dead_letter(item, exc)
+                continue
+            if self._retrying_dead_letters:
+                for item in state.items:
+                    await self.repository.delete_dead_letter(
+                        self.repository.dead_letter_id(state.document_id, item.transcription)
+                    )
+
+    async def _apply_classification(self, item: _WorkItem, classification: Dict[str, Any]) -> None:
+        transcription = item.transcription
+        parent_document_id = item.state.document_id
+        metadata = transcription.setdefault("metadata", {})
+        classification_ts = datetime.now(timezone.utc).isoformat()
+        metadata["classification"] = classification.get("label")
+        metadata["classification_confidence"] = classification.get("confidence")
+        metadata["classification_reason"] = classification.get("reason")
+        metadata["classification_next_action"] = classification.get("next_action")
+        metadata["classification_ts_utc"] = classification_ts
+        transcription["metadata"] = metadata
+        self._processed += 1
+        record = self.repository.build_classification_record(
+            parent_document_id=parent_document_id,
+            manager_name=item.manager_name,
+            specialist_name=item.specialist_name,
+            transcription=transcription,
+            classification=classification,
+            classification_ts_utc=classification_ts,
+            classifier_version=self._classifier_version,
+        )
+        await self.record_writer.add(record)
+        logging.info(
+            "Classified %s/%s (%s) as %s",
+            item.manager_name,
+            item.specialist_name,
+            transcription.get("filename"),
+            metadata["classification"],
+        )
+
 
-        return changed, should_stop
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Classify call transcriptions stored in Cosmos DB with the Azure AI agent."
+    )
+    parser.add_argument("--manager-name", default=None, help="Only classify this manager.")
+    parser.add_argument("--specialist-name", default=None, help="Only classify this specialist.")
+    parser.add_argument(
+        "--limit", type=int, default=None, help="Upper bound for transcriptions to classify."
+    )
+    parser.add_argument(
+        "--skip-already-classified",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Skip transcriptions that already carry classification metadata.",
+    )
+    parser.add_argument(
+        "--only-valid-calls",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Skip transcriptions whose is_valid_call flag is not YES (default: true).",
+    )
+    parser.add_argument(
+        "--change-feed",
+        action="store_true",
+        help="Classify only documents changed since the stored change feed checkpoint.",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="With --change-feed, run a single pass instead of polling forever.",
+    )
+    parser.add_argument(
+        "--poll-seconds",
+        type=float,
+        default=5.0,
+        help="With --change-feed, seconds to wait between passes (default: 5).",
+    )
+    parser.add_argument(
+        "--retry-dead-letters",
+        action="store_true",
+        help="Classify again only the transcripts recorded in the dead-letter container.",
+    )
+    return parser
 
 
 async def main() -> None:
-    pipeline = ClassificationPipeline()
-    await pipeline.run()
+    args = build_parser().parse_args()
+    pipeline = ClassificationPipeline(
+        manager_name=args.manager_name,
+        specialist_name=args.specialist_name,
+        limit=args.limit,
+        skip_already_classified=args.skip_already_classified,
+        only_valid_calls=args.only_valid_calls,
+    )
+    if args.retry_dead_letters:
+        await pipeline.run_dead_letters()
+    elif args.change_feed:
+        await pipeline.run_change_feed(poll_seconds=args.poll_seconds, once=args.once)
+    else:
+        await pipeline.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+"""CLI entry point to remove duplicate classification records, keeping the newest per transcript."""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from app.classify import ClassificationRecordWriter, CosmosTranscriptionRepository
+
+
+def _identity(record: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    transcript = record.get("transcription_id") or record.get("filename")
+    if not record.get("parent_document_id") or not transcript:
+        return None
+    return str(record["parent_document_id"]), str(transcript)
+
+
+def _recency(record: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (
+        record.get("classification_ts_utc") or "",
+        record.get("created_at_utc") or "",
+        record["id"],
+    )
+
+
+async def compact_classification_records(
+    repository: CosmosTranscriptionRepository, *, dry_run: bool = False
+) -> Dict[str, int]:
+    """Delete every classification record except the newest one of each transcript.
+
+    Records written before ids became deterministic carry a random suffix, so reruns left
+    several records per transcript; this collapses them. Records without a transcript
+    identity are left alone. Partitions are compacted one at a time, so only the keys of the
+    current partition are held in memory.
+    """
+    totals = {"scanned": 0, "transcripts": 0, "duplicates": 0, "deleted": 0}
+    writer = None if dry_run else ClassificationRecordWriter(repository)
+    async for partition_value in repository.iter_classification_partitions():
+        newest: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        stale: List[Dict[str, Any]] = []
+        async for record in repository.iter_classification_record_keys(partition_value):
+            totals["scanned"] += 1
+            identity = _identity(record)
+            if identity is None:
+                continue
+            current = newest.get(identity)
+            if current is None:
+                newest[identity] = record
+            elif _recency(record) > _recency(current):
+                stale.append(current)
+                newest[identity] = record
+            else:
+                stale.append(record)
+        totals["transcripts"] += len(newest)
+        totals["duplicates"] += len(stale)
+        if stale and writer is not None:
+            for start in range(0, len(stale), writer.buffer_size):
+                await writer.delete(stale[start : start + writer.buffer_size])
+            totals["deleted"] += len(stale)
+
+    logging.info(
+        "Scanned %s classification records: %s transcripts, %s duplicates, %s deleted",
+        totals["scanned"],
+        totals["transcripts"],
+        totals["duplicates"],
+        totals["deleted"],
+    )
+    return totals
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Deduplicate the classifications container, keeping the newest record per transcript."
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count the duplicates, do not delete anything.",
+    )
+    return parser
+
+
+async def run(dry_run: bool) -> Dict[str, int]:
+    repository = CosmosTranscriptionRepository()
+    try:
+        return await compact_classification_records(repository, dry_run=dry_run)
+    finally:
+        await repository.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("azure").setLevel(logging.WARNING)
+    args = build_parser().parse_args()
+    print(json.dumps(asyncio.run(run(args.dry_run)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
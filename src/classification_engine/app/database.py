@@ -1,9 +1,11 @@
 """Data access helper for the classification engine FastAPI app."""
 
+import asyncio
 import logging
 import os
 import sys
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
 from azure.cosmos import exceptions
 from azure.cosmos.aio import CosmosClient
@@ -20,6 +22,15 @@ COSMOS_KEY = os.getenv("COSMOS_KEY", "")
 COSMOS_DB_NAME = os.getenv("COSMOS_DB_TRANSCRIPTION", "tayradb")
 TRANSCRIPTIONS_CONTAINER = os.getenv("CONTAINER_NAME", "transcriptions")
 CLASSIFICATION_CONTAINER = os.getenv("COSMOS_CLASSIFICATION_CONTAINER", "classifications")
+TRANSCRIPT_LRU_SIZE = int(os.getenv("CLASSIFICATION_TRANSCRIPT_LRU_SIZE", "512"))
+TRANSCRIPT_LOOKUP_CHUNK = 25
+MAX_PAGE_SIZE = 1000
+
+TRANSCRIPTION_FIELDS = "t.id, t.filename, t.is_valid_call, t.metadata"
+CLASSIFICATION_RECORD_FIELDS = (
+    "c.id, c.parent_document_id, c.manager_name, c.specialist_name, c.transcription_id,"
+    " c.filename, c.is_valid_call, c.classification, c.classification_ts_utc, c.created_at_utc"
+)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -37,6 +48,7 @@ class ClassificationDatabase:
         self.classifications_container = CLASSIFICATION_CONTAINER
         self.use_aad_auth = self._should_use_aad_auth()
         self._aad_credential: Optional[DefaultAzureCredential] = None
+        self._transcript_lru: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
         if not self.use_aad_auth and not COSMOS_KEY:
             raise RuntimeError(
                 "COSMOS_KEY is not configured. Set COSMOS_USE_AAD=true to rely on AAD authentication."
@@ -96,11 +108,106 @@ class ClassificationDatabase:
                     specialists.append(specialist)
         return specialists
 
-    async def load_transcriptions(self) -> List[Dict]:
+    async def _query_page(
+        self,
+        container_name: str,
+        query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """Run a query and return one page of results plus the token for the next page.
+
+        Without a page size every remaining result is returned and the token is None.
+        """
+        if page_size is not None:
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE))
         async with self._get_cosmos_client() as client:
-            container = await self._get_container(client, self.transcriptions_container)
-            query = "SELECT * FROM c"
-            return [item async for item in container.query_items(query=query)]
+            container = await self._get_container(client, container_name)
+            pager = container.query_items(
+                query=query,
+                parameters=parameters or None,
+                max_item_count=page_size or MAX_PAGE_SIZE,
+            ).by_page(continuation)
+            items: List[Dict] = []
+            async for page in pager:
+                items.extend([item async for item in page])
+                if page_size is not None:
+                    break
+            return items, pager.continuation_token if page_size is not None else None
+
+    async def _stream_query(
+        self,
+        container_name: str,
+        query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+    ) -> AsyncIterator[Dict]:
+        """Yield every result from ``continuation`` on, one Cosmos page at a time."""
+        page_size = max(1, min(page_size or MAX_PAGE_SIZE, MAX_PAGE_SIZE))
+        async with self._get_cosmos_client() as client:
+            container = await self._get_container(client, container_name)
+            pages = container.query_items(
+                query=query,
+                parameters=parameters or None,
+                max_item_count=page_size,
+            ).by_page(continuation)
+            async for page in pages:
+                async for item in page:
+                    yield item
+
+    @staticmethod
+    def _transcriptions_query(include_text: bool) -> str:
+        if include_text:
+            return "SELECT * FROM c"
+        return (
+            "SELECT c.id, c.name, c.role, ARRAY(SELECT a.id, a.name, a.role,"
+            f" ARRAY(SELECT {TRANSCRIPTION_FIELDS} FROM t IN a.transcriptions) AS transcriptions"
+            " FROM a IN c.assistants) AS assistants FROM c"
+        )
+
+    @staticmethod
+    def _classification_records_query(
+        manager: Optional[str], specialist: Optional[str], include_text: bool
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        filters = []
+        parameters = []
+        if manager:
+            filters.append("c.manager_name = @manager")
+            parameters.append({"name": "@manager", "value": manager})
+        if specialist:
+            filters.append("c.specialist_name = @specialist")
+            parameters.append({"name": "@specialist", "value": specialist})
+        where_clause = f" WHERE {' AND '.join(filters)}" if filters else ""
+        projection = "*" if include_text else CLASSIFICATION_RECORD_FIELDS
+        return f"SELECT {projection} FROM c{where_clause}", parameters
+
+    async def load_transcriptions(
+        self,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+        include_text: bool = True,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        return await self._query_page(
+            self.transcriptions_container,
+            self._transcriptions_query(include_text),
+            page_size=page_size,
+            continuation=continuation,
+        )
+
+    def stream_transcriptions(
+        self,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+        include_text: bool = True,
+    ) -> AsyncIterator[Dict]:
+        return self._stream_query(
+            self.transcriptions_container,
+            self._transcriptions_query(include_text),
+            page_size=page_size,
+            continuation=continuation,
+        )
 
     async def load_transcription_by_filename(self, file_name: str) -> Optional[Dict[str, Any]]:
         normalized = file_name.strip().lower()
@@ -108,47 +215,107 @@ class ClassificationDatabase:
             return None
         async with self._get_cosmos_client() as client:
             container = await self._get_container(client, self.transcriptions_container)
-            query = (
-                "SELECT t AS transcription "
-                "FROM c JOIN a IN c.assistants JOIN t IN a.transcriptions "
-                "WHERE (IS_DEFINED(t.metadata.file_name) AND LOWER(t.metadata.file_name) = @file) "
-                "OR (IS_DEFINED(t.filename) AND LOWER(t.filename) = @file)"
-            )
-            parameters = [{"name": "@file", "value": normalized}]
+            matches = await self._lookup_transcriptions(container, [normalized])
+        return matches.get(normalized)
+
+    @staticmethod
+    def _transcription_match(transcription: Dict[str, Any]) -> Dict[str, Any]:
+        metadata = transcription.get("metadata") or {}
+        return {
+            "metadata": metadata,
+            "file_name": metadata.get("file_name") or transcription.get("filename"),
+            "is_valid_call": transcription.get("is_valid_call"),
+            "transcription": transcription.get("transcription"),
+        }
+
+    async def _lookup_transcriptions(
+        self, container, file_names: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """Resolve lowercase filenames to transcriptions through the LRU and batched queries.
+
+        Names missing from the LRU are looked up with one ARRAY_CONTAINS query per chunk of
+        ``TRANSCRIPT_LOOKUP_CHUNK`` names, with the chunks running concurrently.
+        """
+        matches: Dict[str, Dict[str, Any]] = {}
+        missing: List[str] = []
+        for name in dict.fromkeys(file_names):
+            cached = self._transcript_lru.get(name)
+            if cached is not None:
+                self._transcript_lru.move_to_end(name)
+                matches[name] = cached
+            else:
+                missing.append(name)
+        if not missing:
+            return matches
+
+        query = (
+            "SELECT t AS transcription "
+            "FROM c JOIN a IN c.assistants JOIN t IN a.transcriptions "
+            "WHERE (IS_DEFINED(t.metadata.file_name) AND ARRAY_CONTAINS(@files, LOWER(t.metadata.file_name))) "
+            "OR (IS_DEFINED(t.filename) AND ARRAY_CONTAINS(@files, LOWER(t.filename)))"
+        )
+
+        async def run_chunk(chunk: List[str]) -> None:
+            wanted = set(chunk)
+            parameters = [{"name": "@files", "value": chunk}]
             async for item in container.query_items(query=query, parameters=parameters):
                 transcription = item.get("transcription", {}) or {}
-                metadata = transcription.get("metadata") or {}
-                return {
-                    "metadata": metadata,
-                    "file_name": metadata.get("file_name")
-                    or transcription.get("filename"),
-                    "is_valid_call": transcription.get("is_valid_call"),
-                    "transcription": transcription.get("transcription"),
+                keys = {
+                    str((transcription.get("metadata") or {}).get("file_name") or "").lower(),
+                    str(transcription.get("filename") or "").lower(),
                 }
-        return None
+                for key in keys & wanted:
+                    # Keep the first match per name, like the single-file lookup always did.
+                    matches.setdefault(key, self._transcription_match(transcription))
+
+        await asyncio.gather(
+            *(
+                run_chunk(missing[start : start + TRANSCRIPT_LOOKUP_CHUNK])
+                for start in range(0, len(missing), TRANSCRIPT_LOOKUP_CHUNK)
+            )
+        )
+        for name in missing:
+            if name in matches:
+                self._transcript_lru[name] = matches[name]
+                if len(self._transcript_lru) > TRANSCRIPT_LRU_SIZE:
+                    self._transcript_lru.popitem(last=False)
+        return matches
 
     async def load_classification_records(
-        self, *, manager: Optional[str] = None, specialist: Optional[str] = None
-    ) -> List[Dict]:
-        async with self._get_cosmos_client() as client:
-            container = await self._get_container(client, self.classifications_container)
-            filters = []
-            parameters = []
-            if manager:
-                filters.append("c.manager_name = @manager")
-                parameters.append({"name": "@manager", "value": manager})
-            if specialist:
-                filters.append("c.specialist_name = @specialist")
-                parameters.append({"name": "@specialist", "value": specialist})
-            where_clause = f" WHERE {' AND '.join(filters)}" if filters else ""
-            query = f"SELECT * FROM c{where_clause}"
-            return [
-                item
-                async for item in container.query_items(
-                    query=query,
-                    parameters=parameters if parameters else None,
-                )
-            ]
+        self,
+        *,
+        manager: Optional[str] = None,
+        specialist: Optional[str] = None,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+        include_text: bool = True,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        query, parameters = self._classification_records_query(manager, specialist, include_text)
+        return await self._query_page(
+            self.classifications_container,
+            query,
+            parameters,
+            page_size=page_size,
+            continuation=continuation,
+        )
+
+    def stream_classification_records(
+        self,
+        *,
+        manager: Optional[str] = None,
+        specialist: Optional[str] = None,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+        include_text: bool = True,
+    ) -> AsyncIterator[Dict]:
+        query, parameters = self._classification_records_query(manager, specialist, include_text)
+        return self._stream_query(
+            self.classifications_container,
+            query,
+            parameters,
+            page_size=page_size,
+            continuation=continuation,
+        )
 
     async def load_top_other_classifications(
         self, limit: int = 3, order_type: str = "other"
@@ -171,18 +338,21 @@ class ClassificationDatabase:
                 )
             ]
 
-        enriched: List[Dict[str, Any]] = []
-        for record in records:
-            transcription_text = record.get("transcription")
-            file_name = record.get("filename") or record.get("file_name")
-            if not transcription_text and file_name:
-                match = await self.load_transcription_by_filename(file_name)
-                if match:
-                    transcription_text = match.get("transcription")
-                    record.setdefault("metadata", match.get("metadata"))
-                    record.setdefault("file_name", match.get("file_name"))
-                    record.setdefault("is_valid_call", match.get("is_valid_call"))
-            if transcription_text:
-                record["transcription"] = transcription_text
-            enriched.append(record)
-        return enriched
+            missing = {
+                position: str(record.get("filename") or record.get("file_name")).strip().lower()
+                for position, record in enumerate(records)
+                if not record.get("transcription") and (record.get("filename") or record.get("file_name"))
+            }
+            matches: Dict[str, Dict[str, Any]] = {}
+            if missing:
+                transcriptions = await self._get_container(client, self.transcriptions_container)
+                matches = await self._lookup_transcriptions(transcriptions, list(missing.values()))
+
+        for position, record in enumerate(records):
+            match = matches.get(missing.get(position, ""))
+            if match:
+                record["transcription"] = match.get("transcription")
+                record.setdefault("metadata", match.get("metadata"))
+                record.setdefault("file_name", match.get("file_name"))
+                record.setdefault("is_valid_call", match.get("is_valid_call"))
+        return records
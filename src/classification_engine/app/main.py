@@ -1,6 +1,7 @@
 """FastAPI surface for triggering and querying call classifications."""
 
-from typing import Optional
+import json
+from typing import AsyncIterator, Dict, Optional
 from urllib.parse import unquote
 
 from dotenv import find_dotenv, load_dotenv
@@ -8,7 +9,7 @@ from fastapi import BackgroundTasks, FastAPI, Request, status
 from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
 
 from . import __app__, __version__
 from .background import run_classification_job
@@ -113,10 +114,35 @@ async def classify_calls(
     return JSONResponse({"result": "Classification job accepted."})
 
 
+def _wants_ndjson(request: Request, stream: bool) -> bool:
+    return stream or "application/x-ndjson" in request.headers.get("accept", "")
+
+
+async def _ndjson_lines(items: AsyncIterator[Dict]) -> AsyncIterator[str]:
+    async for item in items:
+        yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+
+
 @app.get("/transcriptions", tags=["Operational Tasks"])
-async def get_transcriptions() -> JSONResponse:
-    data = await database.load_transcriptions()
-    return JSONResponse({"result": data})
+async def get_transcriptions(
+    request: Request,
+    page_size: Optional[int] = None,
+    continuation: Optional[str] = None,
+    include_text: bool = True,
+    stream: bool = False,
+) -> Response:
+    """
+    Returns every manager document, or with ``page_size`` one page of them and the
+    continuation token for the next page.
+    With ``stream=true`` (or ``Accept: application/x-ndjson``) every document from
+    ``continuation`` on is streamed as NDJSON while Cosmos pages arrive.
+    ``include_text=false`` leaves the transcript bodies out.
+    """
+    if _wants_ndjson(request, stream):
+        items = database.stream_transcriptions(page_size, continuation, include_text)
+        return StreamingResponse(_ndjson_lines(items), media_type="application/x-ndjson")
+    data, next_token = await database.load_transcriptions(page_size, continuation, include_text)
+    return JSONResponse({"result": data, "continuation": next_token})
 
 
 @app.get("/transcription-by-file", tags=["Operational Tasks"])
@@ -134,15 +160,38 @@ async def get_transcription_by_file(file_name: str) -> JSONResponse:
 
 @app.get("/classification-records", tags=["Operational Tasks"])
 async def get_classification_records(
-    manager: Optional[str] = None, specialist: Optional[str] = None
-) -> JSONResponse:
+    request: Request,
+    manager: Optional[str] = None,
+    specialist: Optional[str] = None,
+    page_size: Optional[int] = None,
+    continuation: Optional[str] = None,
+    include_text: bool = True,
+    stream: bool = False,
+) -> Response:
+    """
+    Returns every classification record, or with ``page_size`` one page of them and the
+    continuation token for the next page.
+    Supports the same ``stream`` / NDJSON and ``include_text`` options as ``/transcriptions``.
+    """
     decoded_manager = unquote(manager) if manager else None
     decoded_specialist = unquote(specialist) if specialist else None
-    data = await database.load_classification_records(
+    if _wants_ndjson(request, stream):
+        items = database.stream_classification_records(
+            manager=decoded_manager,
+            specialist=decoded_specialist,
+            page_size=page_size,
+            continuation=continuation,
+            include_text=include_text,
+        )
+        return StreamingResponse(_ndjson_lines(items), media_type="application/x-ndjson")
+    data, next_token = await database.load_classification_records(
         manager=decoded_manager,
         specialist=decoded_specialist,
+        page_size=page_size,
+        continuation=continuation,
+        include_text=include_text,
     )
-    return JSONResponse({"result": data})
+    return JSONResponse({"result": data, "continuation": next_token})
 
 
 @app.get("/classification-other", tags=["Operational Tasks"])
@@ -0,0 +1,162 @@
+"""
+Near-duplicate detection for transcripts with MinHash signatures and LSH banding.
+
+Transcripts are reduced to word 3-gram shingles, hashed with CRC32 and mapped through
+``num_perm`` universal hash functions in one vectorised NumPy expression. The minimum of
+each row is the signature. Signatures are split into bands, and two transcripts become
+candidates when any band matches exactly. Candidates are then compared on the fraction of
+equal signature slots, which estimates their Jaccard similarity. Entries are tagged with the
+classifier version that produced them and only match queries for the same version. The
+index is saved as .npz so it survives between runs.
+"""
+
+import json
+import logging
+import re
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SOURCE = "propagated"
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def shingle_hashes(text: str, size: int = 3) -> np.ndarray:
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if len(words) < size:
+        shingles = [" ".join(words)] if words else []
+    else:
+        shingles = [" ".join(words[index : index + size]) for index in range(len(words) - size + 1)]
+    return np.unique(
+        np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64)
+    )
+
+
+class MinHashIndex:
+    """Persistent MinHash/LSH index of transcripts already classified by the agent."""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.9, seed: int = 7) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        # Coefficients stay below 2**32 so a * x (x is a CRC32) cannot overflow uint64.
+        self._a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint64)
+        self.entries: List[Dict[str, Any]] = []
+        self._pending: List[np.ndarray] = []
+        self._buckets: Dict[Tuple[int, bytes], List[int]] = {}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        hashes = shingle_hashes(text)
+        if not hashes.size:
+            return None
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows].tobytes())
+            for band in range(self.bands)
+        ]
+
+    def _signature_at(self, position: int) -> np.ndarray:
+        stored = len(self.signatures)
+        return self.signatures[position] if position < stored else self._pending[position - stored]
+
+    @property
+    def dirty(self) -> bool:
+        """True when entries were added since the index was loaded or last saved."""
+        return bool(self._pending)
+
+    def query(
+        self, text: str, *, classifier_version: str = "", exclude_key: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Return a propagated classification when a stored transcript is similar enough.
+
+        Only entries from ``classifier_version`` are considered, and the entry stored under
+        ``exclude_key`` is skipped so a transcript never matches its own earlier answer.
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        candidates = {
+            position
+            for key in self._band_keys(signature)
+            for position in self._buckets.get(key, ())
+            if self.entries[position].get("classifier_version", "") == classifier_version
+            and self.entries[position]["key"] != exclude_key
+        }
+        best_position, best_similarity = None, 0.0
+        for position in candidates:
+            similarity = float(np.mean(self._signature_at(position) == signature))
+            if similarity > best_similarity:
+                best_position, best_similarity = position, similarity
+        if best_position is None or best_similarity < self.threshold:
+            return None
+        entry = self.entries[best_position]
+        return {
+            **entry["classification"],
+            "source": SOURCE,
+            "propagated_from": entry["key"],
+            "similarity": round(best_similarity, 4),
+        }
+
+    def add(self, key: str, text: str, classification: Dict[str, Any], *, classifier_version: str = "") -> None:
+        signature = self.signature(text)
+        if signature is None:
+            return
+        position = len(self.entries)
+        self.entries.append(
+            {"key": key, "classification": classification, "classifier_version": classifier_version}
+        )
+        self._pending.append(signature)
+        for band_key in self._band_keys(signature):
+            self._buckets.setdefault(band_key, []).append(position)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def save(self, path: str) -> None:
+        if self._pending:
+            self.signatures = np.vstack([self.signatures, np.stack(self._pending)])
+            self._pending = []
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                signatures=self.signatures,
+                a=self._a,
+                b=self._b,
+                entries=np.array(json.dumps(self.entries)),
+                bands=np.array(self.bands),
+            )
+
+    @classmethod
+    def load(cls, path: str, threshold: float = 0.9) -> "MinHashIndex":
+        with np.load(path) as archive:
+            signatures = archive["signatures"]
+            index = cls(num_perm=signatures.shape[1], bands=int(archive["bands"]), threshold=threshold)
+            index._a = archive["a"]
+            index._b = archive["b"]
+            index.signatures = signatures
+            index.entries = json.loads(str(archive["entries"]))
+        for position, signature in enumerate(index.signatures):
+            for band_key in index._band_keys(signature):
+                index._buckets.setdefault(band_key, []).append(position)
+        logging.info("Loaded MinHash index with %s classified transcripts", len(index))
+        return index
+
+    @classmethod
+    def open(cls, path: str, threshold: float = 0.9) -> "MinHashIndex":
+        if Path(path).exists():
+            return cls.load(path, threshold=threshold)
+        return cls(threshold=threshold)
@@ -0,0 +1,308 @@
+"""
+Local statistical pre-classifier trained on the labels the Azure AI agent already produced.
+
+Transcripts are turned into sublinear TF-IDF vectors over word unigrams and bigrams (SciPy
+sparse matrices) and scored by a multinomial logistic regression fitted with L-BFGS. The
+softmax is temperature-calibrated on a held-out split. The same split is used to pick the
+confidence threshold: the lowest one where agreement with the agent reaches the target.
+Transcripts scored above the threshold are labelled locally. The rest go to the agent.
+"""
+
+import json
+import logging
+import math
+import re
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import minimize, minimize_scalar
+
+SOURCE = "preclassifier"
+_TOKEN_PATTERN = re.compile(r"[^\W\d_]{2,}", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    words = _TOKEN_PATTERN.findall((text or "").lower())
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    scores = scores - scores.max(axis=1, keepdims=True)
+    exp = np.exp(scores)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class TfidfVectorizer:
+    """Sublinear TF-IDF over unigrams and bigrams with a vocabulary capped by document frequency."""
+
+    def __init__(self, max_features: int = 20000, min_df: int = 2) -> None:
+        self.max_features = max_features
+        self.min_df = min_df
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.zeros(0, dtype=np.float64)
+
+    def fit(self, texts: Sequence[str]) -> "TfidfVectorizer":
+        document_frequency: Counter = Counter()
+        for text in texts:
+            document_frequency.update(set(tokenize(text)))
+        terms = [term for term, count in document_frequency.items() if count >= self.min_df]
+        terms.sort(key=lambda term: (-document_frequency[term], term))
+        terms = terms[: self.max_features]
+        self.vocabulary = {term: index for index, term in enumerate(terms)}
+        frequencies = np.array([document_frequency[term] for term in terms], dtype=np.float64)
+        self.idf = np.log((1 + len(texts)) / (1 + frequencies)) + 1
+        return self
+
+    def transform(self, texts: Sequence[str]) -> sparse.csr_matrix:
+        indptr = [0]
+        indices: List[int] = []
+        values: List[float] = []
+        for text in texts:
+            counts = Counter(
+                self.vocabulary[token] for token in tokenize(text) if token in self.vocabulary
+            )
+            indices.extend(counts.keys())
+            values.extend(counts.values())
+            indptr.append(len(indices))
+        matrix = sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float64), np.asarray(indices, dtype=np.int64), indptr),
+            shape=(len(texts), len(self.vocabulary)),
+        )
+        matrix.data = 1 + np.log(matrix.data)
+        matrix = matrix.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms).dot(matrix).tocsr()
+
+
+class LocalPreClassifier:
+    """TF-IDF + multinomial logistic regression with a calibrated escalation threshold."""
+
+    def __init__(self, *, max_features: int = 20000, min_df: int = 2, l2: float = 1e-3) -> None:
+        self.vectorizer = TfidfVectorizer(max_features=max_features, min_df=min_df)
+        self.l2 = l2
+        self.labels: List[str] = []
+        self.weights = np.zeros((0, 0), dtype=np.float64)
+        self.bias = np.zeros(0, dtype=np.float64)
+        self.temperature = 1.0
+        self.threshold = 1.0
+        self.next_actions: Dict[str, Optional[str]] = {}
+        self.report: Dict[str, Any] = {}
+
+    # ------------------------------------------------------------------ training
+    def fit(
+        self,
+        examples: Sequence[Dict[str, Any]],
+        *,
+        holdout: float = 0.2,
+        target_agreement: float = 0.95,
+        seed: int = 13,
+    ) -> Dict[str, Any]:
+        """Train on agent-labelled examples ({"text", "label", "next_action"}) and evaluate.
+
+        Returns the evaluation report, which is also stored on the model.
+        """
+        examples = [example for example in examples if example.get("text") and example.get("label")]
+        if len(examples) < 20:
+            raise ValueError(f"Need at least 20 labelled transcripts to train, got {len(examples)}")
+
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(examples))
+        holdout_size = max(1, int(len(examples) * holdout))
+        test = [examples[index] for index in order[:holdout_size]]
+        train = [examples[index] for index in order[holdout_size:]]
+
+        self.labels = sorted({example["label"] for example in train})
+        label_index = {label: index for index, label in enumerate(self.labels)}
+        actions: Dict[str, Counter] = {}
+        for example in train:
+            actions.setdefault(example["label"], Counter())[example.get("next_action")] += 1
+        self.next_actions = {label: counter.most_common(1)[0][0] for label, counter in actions.items()}
+
+        texts = [example["text"] for example in train]
+        features = self.vectorizer.fit(texts).transform(texts)
+        targets = np.array([label_index[example["label"]] for example in train])
+        self._fit_weights(features, targets)
+
+        test = [example for example in test if example["label"] in label_index]
+        test_scores = self._scores(self.vectorizer.transform([example["text"] for example in test]))
+        test_targets = np.array([label_index[example["label"]] for example in test])
+        self.temperature = self._fit_temperature(test_scores, test_targets)
+        probabilities = _softmax(test_scores / self.temperature)
+        self.report = self._evaluate(probabilities, test_targets, target_agreement)
+        self.report.update(
+            {
+                "trained_at_utc": datetime.now(timezone.utc).isoformat(),
+                "train_size": len(train),
+                "holdout_size": len(test),
+                "vocabulary_size": len(self.vectorizer.vocabulary),
+                "temperature": self.temperature,
+            }
+        )
+        self.threshold = self.report["threshold"]
+        return self.report
+
+    def _fit_weights(self, features: sparse.csr_matrix, targets: np.ndarray) -> None:
+        samples, dimensions = features.shape
+        classes = len(self.labels)
+        one_hot = np.zeros((samples, classes))
+        one_hot[np.arange(samples), targets] = 1
+
+        def loss_and_gradient(flat: np.ndarray) -> Tuple[float, np.ndarray]:
+            weights = flat[: dimensions * classes].reshape(dimensions, classes)
+            bias = flat[dimensions * classes :]
+            probabilities = _softmax(features @ weights + bias)
+            loss = -np.sum(one_hot * np.log(probabilities + 1e-12)) / samples
+            loss += 0.5 * self.l2 * np.sum(weights * weights)
+            error = (probabilities - one_hot) / samples
+            gradient_weights = features.T @ error + self.l2 * weights
+            return loss, np.concatenate([np.asarray(gradient_weights).ravel(), error.sum(axis=0)])
+
+        initial = np.zeros(dimensions * classes + classes)
+        result = minimize(loss_and_gradient, initial, jac=True, method="L-BFGS-B", options={"maxiter": 300})
+        self.weights = result.x[: dimensions * classes].reshape(dimensions, classes)
+        self.bias = result.x[dimensions * classes :]
+
+    @staticmethod
+    def _fit_temperature(scores: np.ndarray, targets: np.ndarray) -> float:
+        if not len(targets):
+            return 1.0
+
+        def negative_log_likelihood(log_temperature: float) -> float:
+            probabilities = _softmax(scores / math.exp(log_temperature))
+            return -float(np.mean(np.log(probabilities[np.arange(len(targets)), targets] + 1e-12)))
+
+        result = minimize_scalar(negative_log_likelihood, bounds=(-3, 3), method="bounded")
+        return float(math.exp(result.x))
+
+    def _evaluate(
+        self, probabilities: np.ndarray, targets: np.ndarray, target_agreement: float
+    ) -> Dict[str, Any]:
+        predicted = probabilities.argmax(axis=1)
+        confidence = probabilities.max(axis=1)
+        agree = predicted == targets
+
+        per_label = {}
+        for index, label in enumerate(self.labels):
+            actual = targets == index
+            chosen = predicted == index
+            per_label[label] = {
+                "support": int(actual.sum()),
+                "precision": float(agree[chosen].mean()) if chosen.any() else None,
+                "recall": float(agree[actual].mean()) if actual.any() else None,
+            }
+
+        curve = []
+        threshold = 1.0
+        for candidate in np.round(np.arange(0.5, 1.0, 0.025), 3):
+            covered = confidence >= candidate
+            agreement = float(agree[covered].mean()) if covered.any() else None
+            curve.append(
+                {"threshold": float(candidate), "coverage": float(covered.mean()), "agreement": agreement}
+            )
+            if threshold == 1.0 and agreement is not None and agreement >= target_agreement:
+                threshold = float(candidate)
+
+        return {
+            "agreement": float(agree.mean()) if len(agree) else None,
+            "target_agreement": target_agreement,
+            "threshold": threshold,
+            "coverage_at_threshold": float((confidence >= threshold).mean()) if len(agree) else 0.0,
+            "per_label": per_label,
+            "threshold_curve": curve,
+        }
+
+    # ---------------------------------------------------------------- inference
+    def _scores(self, features: sparse.csr_matrix) -> np.ndarray:
+        return np.asarray(features @ self.weights) + self.bias
+
+    def predict(self, texts: Sequence[str]) -> List[Optional[Dict[str, Any]]]:
+        """Classify a batch; entries below the threshold are None and should go to the agent.
+
+        Texts with no term in the vocabulary are always None: their score would come from the
+        class bias alone.
+        """
+        if not self.labels or not texts:
+            return [None] * len(texts)
+        features = self.vectorizer.transform(texts)
+        known = features.getnnz(axis=1) > 0
+        probabilities = _softmax(self._scores(features) / self.temperature)
+        best = probabilities.argmax(axis=1)
+        results: List[Optional[Dict[str, Any]]] = []
+        for index, confidence, has_terms in zip(best, probabilities[np.arange(len(texts)), best], known):
+            if not has_terms or confidence < self.threshold:
+                results.append(None)
+                continue
+            label = self.labels[index]
+            results.append(
+                {
+                    "label": label,
+                    "confidence": round(float(confidence), 4),
+                    "reason": "Matched the local pre-classifier trained on earlier agent labels.",
+                    "next_action": self.next_actions.get(label),
+                    "source": SOURCE,
+                }
+            )
+        return results
+
+    # -------------------------------------------------------------- persistence
+    def save(self, path: str) -> None:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        terms = sorted(self.vectorizer.vocabulary, key=self.vectorizer.vocabulary.get)
+        metadata = {
+            "labels": self.labels,
+            "temperature": self.temperature,
+            "threshold": self.threshold,
+            "next_actions": self.next_actions,
+            "report": self.report,
+        }
+        with open(target, "wb") as handle:
+            np.savez_compressed(
+                handle,
+                terms=np.array(terms, dtype=str),
+                idf=self.vectorizer.idf,
+                weights=self.weights,
+                bias=self.bias,
+                metadata=np.array(json.dumps(metadata)),
+            )
+        target.with_suffix(".report.json").write_text(json.dumps(self.report, indent=2), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: str, threshold: Optional[float] = None) -> "LocalPreClassifier":
+        with np.load(path, allow_pickle=False) as archive:
+            model = cls()
+            model.vectorizer.vocabulary = {str(term): index for index, term in enumerate(archive["terms"])}
+            model.vectorizer.idf = archive["idf"]
+            model.weights = archive["weights"]
+            model.bias = archive["bias"]
+            metadata = json.loads(str(archive["metadata"]))
+        model.labels = metadata["labels"]
+        model.temperature = metadata["temperature"]
+        model.threshold = threshold if threshold is not None else metadata["threshold"]
+        model.next_actions = metadata["next_actions"]
+        model.report = metadata["report"]
+        return model
+
+
+def training_examples(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep the latest agent label per transcription, ignoring labels not produced by the agent."""
+    latest: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        classification = record.get("classification") or {}
+        if classification.get("source") or not record.get("transcription") or not classification.get("label"):
+            continue
+        key = record.get("transcription_id") or record.get("filename") or record.get("id")
+        current = latest.get(key)
+        if current is None or (record.get("classification_ts_utc") or "") > current["ts"]:
+            latest[key] = {
+                "text": record["transcription"],
+                "label": classification["label"],
+                "next_action": classification.get("next_action"),
+                "ts": record.get("classification_ts_utc") or "",
+            }
+    return list(latest.values())
@@ -0,0 +1,77 @@
+"""CLI entry point to train and evaluate the local pre-classifier from stored agent labels."""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from app.classify import CosmosTranscriptionRepository
+from app.preclassifier import LocalPreClassifier, training_examples
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Train the TF-IDF pre-classifier on the labels stored in the classifications container."
+    )
+    parser.add_argument(
+        "--output",
+        default="models/preclassifier.npz",
+        help="Where to write the model; the evaluation report goes next to it (default: models/preclassifier.npz).",
+    )
+    parser.add_argument(
+        "--target-agreement",
+        type=float,
+        default=0.95,
+        help="Agreement with the agent required on the holdout to pick the threshold (default: 0.95).",
+    )
+    parser.add_argument(
+        "--holdout",
+        type=float,
+        default=0.2,
+        help="Fraction of labelled transcripts kept for calibration and evaluation (default: 0.2).",
+    )
+    parser.add_argument(
+        "--max-features",
+        type=int,
+        default=20000,
+        help="Vocabulary size cap for unigrams and bigrams (default: 20000).",
+    )
+    parser.add_argument(
+        "--min-df",
+        type=int,
+        default=2,
+        help="Minimum number of transcripts a term must appear in (default: 2).",
+    )
+    return parser
+
+
+async def load_examples():
+    repository = CosmosTranscriptionRepository()
+    try:
+        return training_examples([record async for record in repository.iter_classification_records()])
+    finally:
+        await repository.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("azure").setLevel(logging.WARNING)
+    args = build_parser().parse_args()
+
+    examples = asyncio.run(load_examples())
+    logging.info("Training on %s agent-labelled transcripts", len(examples))
+    model = LocalPreClassifier(max_features=args.max_features, min_df=args.min_df)
+    report = model.fit(examples, holdout=args.holdout, target_agreement=args.target_agreement)
+    model.save(args.output)
+    print(json.dumps({key: value for key, value in report.items() if key != "threshold_curve"}, indent=2))
+    logging.info("Saved pre-classifier to %s (threshold %.3f)", args.output, model.threshold)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Client-side token and request budgets for the classification agent."""
+
+import asyncio
+import logging
+import re
+import time
+from typing import Optional
+
+_RETRY_AFTER_PATTERN = re.compile(r"(?:try again|retry) (?:in|after) (\d+(?:\.\d+)?) ?(?:s\b|sec|second)", re.I)
+_RATE_LIMIT_PATTERN = re.compile(r"\b429\b|too many requests|rate[ _]limit", re.I)
+_TRANSIENT_PATTERN = re.compile(
+    r"\b50[0234]\b|server[ _]error|internal error|service unavailable|bad gateway|overloaded|timed? ?out",
+    re.I,
+)
+
+
+def is_rate_limit_error(message: str) -> bool:
+    return bool(_RATE_LIMIT_PATTERN.search(message or ""))
+
+
+def is_transient_error(message: str) -> bool:
+    """5xx and timeout failures, which may succeed on a retry or on another deployment."""
+    return bool(_TRANSIENT_PATTERN.search(message or ""))
+
+
+def parse_retry_after(message: str) -> Optional[float]:
+    """Read the 'try again in N seconds' hint Azure OpenAI puts in rate limit errors."""
+    match = _RETRY_AFTER_PATTERN.search(message or "")
+    return float(match.group(1)) if match else None
+
+
+class TokenBucket:
+    """Bucket refilled continuously at ``per_minute`` units per minute (0 disables it).
+
+    Waiters are served in arrival order: the lock is held while sleeping for the deficit,
+    so a large request cannot be starved by a stream of small ones.
+    """
+
+    def __init__(self, per_minute: float) -> None:
+        self.per_minute = per_minute
+        self._rate = per_minute / 60.0
+        self._available = float(per_minute)
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._available = min(self.per_minute, self._available + (now - self._updated_at) * self._rate)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` units would be available, without taking them."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        deficit = min(amount, self.per_minute) - self._available
+        return deficit / self._rate if deficit > 0 else 0.0
+
+    async def acquire(self, amount: float) -> float:
+        """Take ``amount`` units, waiting for the refill if needed. Returns the seconds waited."""
+        if self.per_minute <= 0:
+            return 0.0
+        amount = min(amount, self.per_minute)
+        waited = 0.0
+        async with self._lock:
+            self._refill()
+            if self._available < amount:
+                waited = (amount - self._available) / self._rate
+                await asyncio.sleep(waited)
+                self._refill()
+            self._available -= amount
+        return waited
+
+
+class AgentRateLimiter:
+    """Tokens-per-minute and requests-per-minute budgets shared by every classifier worker."""
+
+    def __init__(self, tokens_per_minute: float = 0, requests_per_minute: float = 0) -> None:
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.requests = TokenBucket(requests_per_minute)
+        self._paused_until = 0.0
+        self.waited_seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.tokens.per_minute > 0 or self.requests.per_minute > 0
+
+    def wait_time(self, tokens: int) -> float:
+        pause = self._paused_until - time.monotonic()
+        return max(0.0, pause, self.requests.wait_time(1), self.tokens.wait_time(tokens))
+
+    async def acquire(self, tokens: int) -> None:
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+            self.waited_seconds += pause
+        waited = await self.requests.acquire(1)
+        waited += await self.tokens.acquire(tokens)
+        self.waited_seconds += waited
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every worker after the service throttled one of them."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        logging.info("Pausing agent requests for %.1fs after throttling", seconds)
@@ -0,0 +1,129 @@
+"""Routing of agent requests across several model deployments with spillover."""
+
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from app.ratelimit import AgentRateLimiter
+
+
+class ModelDeployment:
+    """One model deployment with its own quota, health and latency tracking."""
+
+    def __init__(
+        self,
+        *,
+        name: str,
+        endpoint: str,
+        deployment_name: str,
+        priority: int = 0,
+        tokens_per_minute: float = 0,
+        requests_per_minute: float = 0,
+    ) -> None:
+        self.name = name
+        self.endpoint = endpoint
+        self.deployment_name = deployment_name
+        self.priority = priority
+        self.rate_limiter = AgentRateLimiter(tokens_per_minute, requests_per_minute)
+        self.client: Any = None
+        self.chat_options: Any = None
+        self.latency_ewma: Optional[float] = None
+        self.unhealthy_until = 0.0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def record_latency(self, seconds: float, alpha: float = 0.2) -> None:
+        self.calls += 1
+        if self.latency_ewma is None:
+            self.latency_ewma = seconds
+        else:
+            self.latency_ewma = alpha * seconds + (1 - alpha) * self.latency_ewma
+
+    def mark_unhealthy(self, seconds: float) -> None:
+        self.failures += 1
+        self.unhealthy_until = max(self.unhealthy_until, time.monotonic() + seconds)
+        self.rate_limiter.pause(seconds)
+
+
+class DeploymentRouter:
+    """Sends each request to the best deployment that can take it now.
+
+    Deployments that can serve the request without waiting on their limiter are preferred,
+    lowest priority number first, then lowest latency EWMA and fewest requests in flight. When
+    none can serve immediately, the one with the shortest wait wins, so a throttled primary
+    spills over to the secondaries instead of stalling the batch.
+    """
+
+    def __init__(self, deployments: List[ModelDeployment]) -> None:
+        if not deployments:
+            raise RuntimeError("At least one model deployment must be configured.")
+        self.deployments = deployments
+
+    @classmethod
+    def from_env(cls) -> "DeploymentRouter":
+        """Read CALL_CLASSIFIER_DEPLOYMENTS (JSON list) or fall back to the single-deployment settings."""
+        raw = os.getenv("CALL_CLASSIFIER_DEPLOYMENTS", "").strip()
+        default_tpm = float(os.getenv("CALL_CLASSIFIER_TOKENS_PER_MINUTE", "0"))
+        default_rpm = float(os.getenv("CALL_CLASSIFIER_REQUESTS_PER_MINUTE", "0"))
+        if not raw:
+            return cls(
+                [
+                    ModelDeployment(
+                        name="default",
+                        endpoint=os.getenv("AZURE_AI_PROJECT_ENDPOINT", ""),
+                        deployment_name=os.getenv("AZURE_AI_MODEL_DEPLOYMENT_NAME", ""),
+                        tokens_per_minute=default_tpm,
+                        requests_per_minute=default_rpm,
+                    )
+                ]
+            )
+        entries: List[Dict[str, Any]] = json.loads(raw)
+        return cls(
+            [
+                ModelDeployment(
+                    name=entry.get("name") or entry["deployment"],
+                    endpoint=entry.get("endpoint") or os.getenv("AZURE_AI_PROJECT_ENDPOINT", ""),
+                    deployment_name=entry["deployment"],
+                    priority=int(entry.get("priority", index)),
+                    tokens_per_minute=float(entry.get("tokens_per_minute", 0)),
+                    requests_per_minute=float(entry.get("requests_per_minute", 0)),
+                )
+                for index, entry in enumerate(entries)
+            ]
+        )
+
+    @property
+    def primary(self) -> ModelDeployment:
+        return min(self.deployments, key=lambda deployment: deployment.priority)
+
+    @property
+    def limited(self) -> bool:
+        return any(deployment.rate_limiter.enabled for deployment in self.deployments)
+
+    def choose(self, tokens: int) -> ModelDeployment:
+        def wait(deployment: ModelDeployment) -> float:
+            health_wait = max(0.0, deployment.unhealthy_until - time.monotonic())
+            return max(health_wait, deployment.rate_limiter.wait_time(tokens))
+
+        # Keyed by identity: the same deployment name can be configured in several regions.
+        waits = {id(deployment): wait(deployment) for deployment in self.deployments}
+        ready = [deployment for deployment in self.deployments if waits[id(deployment)] == 0]
+        if ready:
+            return min(
+                ready,
+                key=lambda deployment: (
+                    deployment.priority,
+                    deployment.latency_ewma or 0.0,
+                    deployment.in_flight,
+                ),
+            )
+        chosen = min(self.deployments, key=lambda deployment: (waits[id(deployment)], deployment.priority))
+        logging.debug("All deployments busy; %s frees up first (%.1fs)", chosen.name, waits[id(chosen)])
+        return chosen
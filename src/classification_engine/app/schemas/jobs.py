@@ -23,3 +23,23 @@ class ClassificationJobParams(BaseModel):
         default=True,
         description="Skip transcripts whose is_valid_call flag is not YES.",
     )
+    concurrency: Optional[int] = Field(
+        default=None,
+        description="Concurrent classifier workers. Defaults to CALL_CLASSIFIER_CONCURRENCY (8).",
+    )
+    batch_size: Optional[int] = Field(
+        default=None,
+        description="Transcripts packed into one agent request. Defaults to CALL_CLASSIFIER_BATCH_SIZE (1).",
+    )
+    batch_token_budget: Optional[int] = Field(
+        default=None,
+        description="Transcript tokens allowed per batched request. Defaults to CALL_CLASSIFIER_BATCH_TOKEN_BUDGET (6000).",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Classify only documents changed since the last change feed checkpoint.",
+    )
+    retry_dead_letters: bool = Field(
+        default=False,
+        description="Classify again only the transcripts recorded in the dead-letter container.",
+    )
@@ -0,0 +1,35 @@
+"""Token counting for classification prompts."""
+
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Optional
+
+import tiktoken
+
+# Rough characters-per-token ratio used when the tiktoken encoding cannot be loaded
+# (for example on hosts without access to the encoding download).
+FALLBACK_CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding() -> Optional[Any]:
+    encoding_name = os.getenv("CALL_CLASSIFIER_TOKEN_ENCODING", "o200k_base")
+    try:
+        return tiktoken.get_encoding(encoding_name)
+    except Exception as exc:  # pragma: no cover - depends on network access
+        logging.warning(
+            "Unable to load tiktoken encoding %s (%s). Estimating tokens from characters.",
+            encoding_name,
+            exc,
+        )
+        return None
+
+
+def count_tokens(text: str) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // FALLBACK_CHARS_PER_TOKEN + 1
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,59 @@
+"""
+In-process cache for the read endpoints of the transcription engine.
+
+Entries are keyed by the Cosmos query, its parameters and the pagination arguments, and
+expire after a short TTL. The transcription processor clears the cache whenever it writes
+a transcription, so API readers in the same process never see stale pages for longer than
+a single save.
+"""
+
+import os
+import threading
+import time
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class QueryCache:
+    """
+    Thread-safe TTL cache for query results.
+
+    Background transcription jobs run on a worker thread while the API serves requests on the
+    event loop thread, so every access is guarded by a lock.
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 512) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        if self.ttl_seconds <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                now = time.monotonic()
+                self._entries = {k: v for k, v in self._entries.items() if v[0] >= now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+query_cache = QueryCache(ttl_seconds=float(os.getenv("TRANSCRIPTION_API_CACHE_TTL", "30")))
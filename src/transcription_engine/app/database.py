@@ -1,24 +1,36 @@
 """
 This module contains functions for loading data from the Cosmos DB.
 Functions:
+    load_managers_names() -> Dict: Loads a page of manager names.
     load_manager_data(manager_name: Any) -> Dict: Loads manager data
-        from the evaluations container in the Cosmos DB based on the given manager name.
-    load_transcription_data(specialist_name: Any) -> List[Dict]: Loads transcription data
+        from the transcriptions container in the Cosmos DB based on the given manager name.
+    load_transcription_data(specialist_name: Any) -> Dict: Loads a page of transcription data
         for a given specialist name.
+    load_transcriptions() -> Dict: Loads a page of manager documents.
+
+All queries are parameterised, filtered server-side and project only the fields the API
+returns. List queries are paginated with Cosmos continuation tokens and cached for a short
+time in the process (see app.cache).
 """
 
 import logging
 import os
 import sys
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from azure.cosmos.aio import CosmosClient
 from azure.cosmos import exceptions
 
+from app.cache import query_cache
+
 
 COSMOS_ENDPOINT = os.getenv("COSMOS_ENDPOINT", "")
 COSMOS_KEY = os.getenv("COSMOS_KEY", "")
 COSMOS_DB_TRANSCRIPTION = os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job")
+MAX_PAGE_SIZE = 1000
+
+TRANSCRIPTION_FIELDS = "t.id, t.filename, t.is_valid_call, t.metadata, t.failure_reason"
+TRANSCRIPTION_FIELDS_WITH_TEXT = f"{TRANSCRIPTION_FIELDS}, t.transcription"
 
 
 logger = logging.getLogger()
@@ -26,24 +38,89 @@ logger.setLevel(logging.INFO)
 logger.addHandler(logging.StreamHandler(stream=sys.stdout))
 
 
+def _specialist_projection(alias: str, include_text: bool) -> str:
+    fields = TRANSCRIPTION_FIELDS_WITH_TEXT if include_text else TRANSCRIPTION_FIELDS
+    return (
+        f"{alias}.id, {alias}.name, {alias}.role, "
+        f"ARRAY(SELECT {fields} FROM t IN {alias}.transcriptions) AS transcriptions"
+    )
+
+
 class TranscriptionDatabase:
 
     def __init__(self) -> None:
         self.database_name = COSMOS_DB_TRANSCRIPTION
+        self.container_name = os.getenv("CONTAINER_NAME", "transcriptions")
 
-    async def load_managers_names(self):
+    async def _get_container(self, client: CosmosClient):
+        try:
+            database = client.get_database_client(self.database_name)
+            await database.read()
+        except exceptions.CosmosResourceNotFoundError:
+            await client.create_database(self.database_name)
+            database = client.get_database_client(self.database_name)
+        return database.get_container_client(self.container_name)
+
+    async def _query_page(
+        self,
+        query: str,
+        parameters: Optional[List[Dict[str, Any]]] = None,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+    ) -> Tuple[List[Any], Optional[str]]:
         """
-        Load list of managers
+        Runs a query and returns a single page of results plus the continuation token.
+        Without a page size every remaining result is returned and the token is None.
+        Args:
+            query (str): The parameterised Cosmos SQL query.
+            parameters (list, optional): The query parameters.
+            page_size (int, optional): Maximum number of items in the page, None for all of them.
+            continuation (str, optional): The token returned by the previous page.
+        Returns:
+            Tuple[List, Optional[str]]: The page items and the token for the next page, if any.
         """
+        if page_size is not None:
+            page_size = max(1, min(page_size, MAX_PAGE_SIZE))
+        cache_key = (
+            query,
+            tuple((param["name"], param["value"]) for param in parameters or []),
+            page_size,
+            continuation,
+        )
+        cached = query_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         async with CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY) as client:
-            database = client.get_database_client(self.database_name)
-            container = database.get_container_client("evaluations")
-            query = "SELECT * FROM c"
-        return [item["name"] async for item in container.query_items(query=query)]
+            container = await self._get_container(client)
+            pager = container.query_items(
+                query=query,
+                parameters=parameters,
+                max_item_count=page_size or MAX_PAGE_SIZE,
+            ).by_page(continuation)
+            items: List[Any] = []
+            async for page in pager:
+                items.extend([item async for item in page])
+                if page_size is not None:
+                    break
+            result = (items, pager.continuation_token if page_size is not None else None)
+
+        query_cache.set(cache_key, result)
+        return result
+
+    async def load_managers_names(
+        self, page_size: Optional[int] = None, continuation: Optional[str] = None
+    ) -> Tuple[List[str], Optional[str]]:
+        """
+        Load a page of manager names from the transcriptions container.
+        """
+        return await self._query_page(
+            "SELECT VALUE c.name FROM c", page_size=page_size, continuation=continuation
+        )
 
-    async def load_manager_data(self, manager_name: str) -> Dict:
+    async def load_manager_data(self, manager_name: str) -> Optional[Dict]:
         """
-        Loads manager data from the evaluations container
+        Loads manager data from the transcriptions container
         in the Cosmos DB based on the given manager name.
         Args:
             manager_name (str): The name of the manager.
@@ -52,74 +129,60 @@ class TranscriptionDatabase:
         Raises:
             Exception: If an error occurs while loading the manager data.
         """
-        manager_name = str(manager_name).upper()
-        async with CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY) as client:
-            try:
-                database = client.get_database_client(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
-                await database.read()
-            except exceptions.CosmosResourceNotFoundError:
-                await client.create_database(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
-            container = database.get_container_client(os.getenv("CONTAINER_NAME", "transcriptions"))
-            query = "SELECT * FROM c"
-            managers = [
-                item
-                async for item in container.query_items(query=query)
-            ]  #type: ignore
-
-        for manager in managers:
-            condition = str(manager["name"]).upper() == manager_name
-            if condition:
-                return manager
-
-    async def load_transcription_data(self, specialist_id: str) -> List[Dict]:
+        # TOP 1 read to the end: a cross-partition query may return empty pages before the match.
+        query = (
+            f"SELECT TOP 1 c.id, c.name, c.role, ARRAY(SELECT {_specialist_projection('a', True)}"
+            " FROM a IN c.assistants) AS assistants"
+            " FROM c WHERE STRINGEQUALS(c.name, @manager, true)"
+        )
+        items, _ = await self._query_page(query, [{"name": "@manager", "value": manager_name}])
+        return items[0] if items else None
+
+    async def load_transcription_data(
+        self,
+        specialist_id: str,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+        include_text: bool = True,
+    ) -> Tuple[List[Dict], Optional[str]]:
         """
         Loads transcription data for a given specialist name.
         Args:
             specialist_name (str): The name of the specialist.
+            page_size (int, optional): Maximum number of specialists in the page, None for all.
+            continuation (str, optional): The token returned by the previous page.
+            include_text (bool, optional): Whether to return the transcript bodies.
         Returns:
-            List[Dict]: A list of dictionaries containing the transcription data for the specialist.
+            Tuple[List[Dict], Optional[str]]: The specialists and the token for the next page.
         """
-        async with CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY) as client:
-            try:
-                database = client.get_database_client(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
-                await database.read()
-            except exceptions.CosmosResourceNotFoundError:
-                await client.create_database(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
-            container = database.get_container_client(os.getenv("CONTAINER_NAME", "transcriptions"))
-            query = "SELECT * FROM c"
-            managers = [
-                item
-                async for item in container.query_items(query=query)
-            ]  #type: ignore
-
-        specialists = []
-        for manager in managers:
-            for specialist in manager["assistants"]:
-                condition = str(specialist["name"]).upper() == specialist_id.upper()
-                if condition:
-                    specialists.append(specialist)
-        return specialists
-
-    async def load_transcriptions(self) -> List[Dict]:
+        query = (
+            f"SELECT {_specialist_projection('a', include_text)}"
+            " FROM c JOIN a IN c.assistants WHERE STRINGEQUALS(a.name, @specialist, true)"
+        )
+        return await self._query_page(
+            query,
+            [{"name": "@specialist", "value": specialist_id}],
+            page_size=page_size,
+            continuation=continuation,
+        )
+
+    async def load_transcriptions(
+        self,
+        page_size: Optional[int] = None,
+        continuation: Optional[str] = None,
+        include_text: bool = True,
+    ) -> Tuple[List[Dict], Optional[str]]:
         """
-        Loads transcription data for a given specialist name.
+        Loads a page of manager documents with their specialists and transcriptions.
         Args:
-            specialist_name (str): The name of the specialist.
+            page_size (int, optional): Maximum number of managers in the page, None for all.
+            continuation (str, optional): The token returned by the previous page.
+            include_text (bool, optional): Whether to return the transcript bodies.
         Returns:
-            List[Dict]: A list of dictionaries containing the transcription data for the specialist.
+            Tuple[List[Dict], Optional[str]]: The managers and the token for the next page.
         """
-        async with CosmosClient(COSMOS_ENDPOINT, COSMOS_KEY) as cosmos_client:
-            try:
-                database = cosmos_client.get_database_client(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
-                await database.read()
-            except exceptions.CosmosResourceNotFoundError:
-                await cosmos_client.create_database(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
-            container = database.get_container_client(os.getenv("CONTAINER_NAME", "transcriptions"))
-            query = "SELECT * FROM c"
-
-            response = [
-                item
-                async for item
-                in container.query_items(query=query)
-            ]
-        return response
+        query = (
+            f"SELECT c.id, c.name, c.role, ARRAY(SELECT {_specialist_projection('a', include_text)}"
+            " FROM a IN c.assistants) AS assistants FROM c"
+        )
+        return await self._query_page(query, page_size=page_size, continuation=continuation)
@@ -0,0 +1,159 @@
+"""
+Incremental discovery of new audio blobs.
+
+A watermark per origin container is persisted as a small JSON blob in the destination
+container. When the optional azure-storage-blob-changefeed package is installed and the
+storage account has the Blob change feed enabled, discovery resumes the change feed from the
+saved cursor and yields only blobs created since the last successful run. Otherwise it falls
+back to listing the container and keeping blobs whose last_modified is after the watermark.
+
+The watermark is the run start minus a clock-skew margin, so blobs committed while the listing
+was running are listed again next time; the processor skips files that already have a
+transcript. It is only advanced by commit(), which the processor calls once the listing was
+consumed to the end, so a run that stops early is simply repeated from the same point. Runs
+filtered by manager, specialist or failed files keep their own watermark, so they never move
+the one used by unfiltered runs.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Callable, Optional
+
+from azure.core.exceptions import ResourceNotFoundError
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+
+try:
+    from azure.storage.blob.changefeed import ChangeFeedClient
+except ImportError:  # pragma: no cover - optional dependency
+    ChangeFeedClient = None
+
+
+@dataclass
+class DiscoveredBlob:
+    name: str
+    last_modified: Optional[datetime] = None
+
+
+class IncrementalDiscovery:
+    """Yields blobs created after the persisted watermark of an origin container."""
+
+    WATERMARK_PREFIX = "watermarks"
+    CLOCK_SKEW = timedelta(minutes=5)
+
+    def __init__(
+        self,
+        blob_service_client: BlobServiceClient,
+        origin_container: str,
+        destination_container: str,
+        change_feed_factory: Optional[Callable[[], "ChangeFeedClient"]] = None,
+        scope: Optional[str] = None,
+    ) -> None:
+        self.origin_container = origin_container
+        self.use_change_feed = (
+            change_feed_factory is not None
+            and ChangeFeedClient is not None
+            and os.getenv("TRANSCRIPTION_USE_CHANGE_FEED", "true").lower() in {"1", "true", "yes"}
+        )
+        self._change_feed_factory = change_feed_factory
+        self._watermark_client = blob_service_client.get_blob_client(
+            container=destination_container,
+            blob=(
+                f"{self.WATERMARK_PREFIX}/{origin_container}/{scope}.json"
+                if scope
+                else f"{self.WATERMARK_PREFIX}/{origin_container}.json"
+            ),
+        )
+        self._last_modified: Optional[datetime] = None
+        self._cursor: Optional[str] = None
+        self._next_cursor: Optional[str] = None
+        self._started_at: Optional[datetime] = None
+
+    async def load(self) -> None:
+        try:
+            download_stream = await self._watermark_client.download_blob()
+            state = json.loads(await download_stream.readall())
+        except ResourceNotFoundError:
+            logging.info("No watermark for container %s. Discovering every blob.", self.origin_container)
+            return
+        if state.get("last_modified"):
+            self._last_modified = datetime.fromisoformat(state["last_modified"])
+        self._cursor = state.get("change_feed_cursor")
+        logging.info(
+            "Loaded watermark for container %s: last_modified=%s cursor=%s",
+            self.origin_container,
+            self._last_modified,
+            bool(self._cursor),
+        )
+
+    async def commit(self) -> None:
+        if self._started_at is None:
+            return
+        last_modified = self._started_at - self.CLOCK_SKEW
+        if self._last_modified and self._last_modified > last_modified:
+            last_modified = self._last_modified
+        state = {
+            "origin_container": self.origin_container,
+            "last_modified": last_modified.isoformat(),
+            "change_feed_cursor": self._next_cursor or self._cursor,
+            "updated_at_utc": datetime.now(timezone.utc).isoformat(),
+        }
+        await self._watermark_client.upload_blob(json.dumps(state), overwrite=True)
+        logging.info("Watermark for container %s advanced to %s", self.origin_container, state["last_modified"])
+
+    async def iter_blobs(self, container_client: ContainerClient, results_per_page: int) -> AsyncIterator:
+        self._started_at = datetime.now(timezone.utc)
+        if self.use_change_feed:
+            blobs = self._iter_change_feed(results_per_page)
+        else:
+            blobs = container_client.list_blobs(results_per_page=results_per_page)
+        async for blob in blobs:
+            # The change feed already resumes from its cursor; listings are filtered by the watermark.
+            if (
+                not self.use_change_feed
+                and self._last_modified
+                and blob.last_modified
+                and blob.last_modified <= self._last_modified
+            ):
+                continue
+            yield blob
+
+    async def _iter_change_feed(self, results_per_page: int) -> AsyncIterator[DiscoveredBlob]:
+        change_feed_client = self._change_feed_factory()
+        blob_marker = f"/containers/{self.origin_container}/blobs/"
+        cursor = self._cursor
+        while True:
+            events, cursor = await asyncio.to_thread(
+                self._read_change_feed_page, change_feed_client, cursor, results_per_page
+            )
+            for event in events:
+                subject = event.get("subject", "")
+                if event.get("eventType") != "BlobCreated" or blob_marker not in subject:
+                    continue
+                event_time = event.get("eventTime")
+                yield DiscoveredBlob(
+                    name=subject.split(blob_marker, 1)[1],
+                    last_modified=datetime.fromisoformat(event_time.replace("Z", "+00:00")) if isinstance(event_time, str) else event_time,
+                )
+            if cursor:
+                self._next_cursor = cursor
+            if not events or not cursor:
+                break
+
+    def _read_change_feed_page(self, change_feed_client, cursor: Optional[str], results_per_page: int):
+        if cursor:
+            pages = change_feed_client.list_changes(results_per_page=results_per_page).by_page(
+                continuation_token=cursor
+            )
+        else:
+            pages = change_feed_client.list_changes(
+                start_time=self._last_modified, results_per_page=results_per_page
+            ).by_page()
+        try:
+            events = list(next(pages))
+        except StopIteration:
+            events = []
+        return events, pages.continuation_token
@@ -13,3 +13,22 @@ class RetrievalException(Exception):
         """
         super().__init__(message)
         self.message = message
+
+
+class SpeechTransientError(Exception):
+    """
+    SpeechTransientError Exception raised when a Speech call fails with a retryable error
+    (network error, 408, 429, 499 or 5xx).
+    """
+
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        """
+        Initializes the SpeechTransientError.
+
+        Args:
+            message (str): The message to be displayed when the exception is raised.
+            retry_after (float, optional): Seconds the service asked us to wait, if any.
+        """
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
@@ -0,0 +1,81 @@
+"""CLI entry point to bulk import existing text transcripts into the transcription store."""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from dotenv import find_dotenv, load_dotenv
+
+from app.importer import TranscriptImporter
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Import text transcripts (folder or zip of .txt files) into Cosmos DB."
+    )
+    parser.add_argument(
+        "source",
+        help="Folder or .zip file that holds the .txt transcripts.",
+    )
+    parser.add_argument(
+        "--mapping",
+        default=None,
+        help="CSV with filename,manager,specialist columns. Without it, files must live under manager/specialist/ folders.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="Transcripts buffered per manager before they are upserted (default: 500).",
+    )
+    parser.add_argument(
+        "--batch-bytes",
+        type=int,
+        default=1024 * 1024,
+        help="Serialized transcript bytes buffered per manager before they are upserted (default: 1 MiB).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Max concurrent manager document upserts (default: 8).",
+    )
+    parser.add_argument(
+        "--ru-per-second",
+        type=float,
+        default=0,
+        help="Request units per second the import may consume (0 = unlimited).",
+    )
+    parser.add_argument(
+        "--encoding",
+        default="utf-8",
+        help="Text encoding of the transcript files (default: utf-8).",
+    )
+    return parser
+
+
+def main():
+    load_dotenv(find_dotenv())
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("azure").setLevel(logging.WARNING)
+    parser = build_parser()
+    args = parser.parse_args()
+
+    importer = TranscriptImporter(
+        batch_size=args.batch_size,
+        batch_bytes=args.batch_bytes,
+        concurrency=args.concurrency,
+        ru_per_second=args.ru_per_second,
+        encoding=args.encoding,
+    )
+    asyncio.run(importer.run(args.source, args.mapping))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+"""
+Bulk import of existing text transcripts into the transcription store.
+
+Transcripts are streamed from a folder or a zip file and grouped per manager. Each
+manager's pending transcripts are merged into its Cosmos document with one read and one
+upsert per batch, instead of one read-modify-write per file. A batch is flushed when it
+reaches a transcript count or a serialized size, and transcripts whose filename the manager
+document already holds are skipped, so an import can be re-run safely. Flushes of different managers
+run concurrently up to a limit, flushes of the same manager are serialised, and the request
+charge of every Cosmos call is paid from a shared RU-per-second budget. A failed flush is
+recorded and the import carries on with the other managers; run() raises at the end if any
+transcripts could not be written.
+"""
+
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from azure.cosmos import exceptions
+from azure.cosmos.aio import CosmosClient
+from azure.identity.aio import DefaultAzureCredential
+
+from app.schemas import ManagerModel, SpecialistItem, Transcription
+
+
+class RequestUnitBudget:
+    """Token bucket of request units refilled at a fixed rate (0 disables throttling)."""
+
+    def __init__(self, ru_per_second: float) -> None:
+        self.ru_per_second = ru_per_second
+        self._available = ru_per_second
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def spend(self, request_charge: float) -> None:
+        if self.ru_per_second <= 0:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            self._available = min(
+                self.ru_per_second, self._available + (now - self._updated_at) * self.ru_per_second
+            )
+            self._updated_at = now
+            self._available -= request_charge
+            if self._available < 0:
+                await asyncio.sleep(-self._available / self.ru_per_second)
+
+
+class TranscriptImporter:
+    """Streams text transcripts into manager documents using batched upserts."""
+
+    # Cosmos DB rejects items larger than 2 MB.
+    MAX_DOCUMENT_BYTES = 2 * 1024 * 1024
+
+    def __init__(
+        self,
+        *,
+        batch_size: int = 500,
+        batch_bytes: int = 1024 * 1024,
+        concurrency: int = 8,
+        ru_per_second: float = 0,
+        encoding: str = "utf-8",
+    ) -> None:
+        self.cosmos_endpoint = os.getenv("COSMOS_ENDPOINT", "")
+        self.cosmos_key = os.getenv("COSMOS_KEY", "")
+        self.database_name = os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job")
+        self.container_name = os.getenv("CONTAINER_NAME", "transcriptions")
+        self.use_aad_auth = self._should_use_aad_auth()
+        self._aad_credential: DefaultAzureCredential | None = None
+        self.batch_size = batch_size
+        self.batch_bytes = batch_bytes
+        self.encoding = encoding
+        self.budget = RequestUnitBudget(ru_per_second)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._manager_locks: Dict[str, asyncio.Lock] = {}
+        self._pending: Dict[str, Dict[str, List[Transcription]]] = {}
+        self._pending_bytes: Dict[str, int] = {}
+        self._pending_filenames: Dict[str, set[str]] = {}
+        self._flushes: set[asyncio.Task] = set()
+        self.imported = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.failures: List[Tuple[str, int, BaseException]] = []
+
+    def _should_use_aad_auth(self) -> bool:
+        flag = os.getenv("COSMOS_USE_AAD", "")
+        if flag:
+            return flag.lower() in {"1", "true", "yes"}
+        return not bool(self.cosmos_key)
+
+    def _get_cosmos_client(self) -> CosmosClient:
+        if self.use_aad_auth:
+            if not self._aad_credential:
+                self._aad_credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
+            return CosmosClient(self.cosmos_endpoint, credential=self._aad_credential)
+        if not self.cosmos_key:
+            raise RuntimeError("COSMOS_KEY is empty and AAD auth is disabled. Set COSMOS_USE_AAD=true or provide a key.")
+        return CosmosClient(self.cosmos_endpoint, self.cosmos_key)
+
+    @staticmethod
+    def load_mapping(mapping_path: Optional[str]) -> Dict[str, Tuple[str, str]]:
+        """Read a CSV with filename, manager and specialist columns."""
+        if not mapping_path:
+            return {}
+        mapping = {}
+        with open(mapping_path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                mapping[row["filename"].strip().lower()] = (row["manager"].strip(), row["specialist"].strip())
+        return mapping
+
+    def iter_source(self, source: str) -> Iterator[Tuple[str, str]]:
+        """Yield (relative path, text) for every .txt file in a folder or zip, one file at a time."""
+        if zipfile.is_zipfile(source):
+            with zipfile.ZipFile(source) as archive:
+                for name in archive.namelist():
+                    if name.lower().endswith(".txt"):
+                        yield name, archive.read(name).decode(self.encoding, errors="replace")
+            return
+        root = Path(source)
+        for path in sorted(root.rglob("*.txt")):
+            yield path.relative_to(root).as_posix(), path.read_text(encoding=self.encoding, errors="replace")
+
+    @staticmethod
+    def resolve_owner(relative_path: str, mapping: Dict[str, Tuple[str, str]]) -> Optional[Tuple[str, str]]:
+        owner = mapping.get(relative_path.lower()) or mapping.get(os.path.basename(relative_path).lower())
+        if owner:
+            return owner
+        parts = relative_path.split("/")
+        if len(parts) >= 3:
+            return parts[-3], parts[-2]
+        return None
+
+    async def run(self, source: str, mapping_path: Optional[str] = None) -> int:
+        mapping = self.load_mapping(mapping_path)
+        start = time.time()
+        try:
+            async with self._get_cosmos_client() as client:
+                container = await self._get_container(client)
+                for relative_path, text in self.iter_source(source):
+                    owner = self.resolve_owner(relative_path, mapping)
+                    if not owner:
+                        logging.warning("No manager/specialist mapping for %s. Skipping.", relative_path)
+                        self.skipped += 1
+                        continue
+                    manager_name, specialist_name = (name.upper() for name in owner)
+                    filename = f"{manager_name}/{specialist_name}/{os.path.basename(relative_path)}"
+                    pending_filenames = self._pending_filenames.setdefault(manager_name, set())
+                    if filename in pending_filenames:
+                        logging.info("Skipping duplicate transcript %s", filename)
+                        self.duplicates += 1
+                        continue
+                    pending_filenames.add(filename)
+                    transcription = Transcription(
+                        id=str(uuid.uuid4()),
+                        filename=filename,
+                        transcription=text.strip(),
+                        is_valid_call="YES" if text.strip() else "NO",
+                        metadata={
+                            "file_name": filename.lower().replace(" ", "_"),
+                            "source": "import",
+                            "imported_at_utc": datetime.now(timezone.utc).isoformat(),
+                        },
+                    )
+                    specialists = self._pending.setdefault(manager_name, {})
+                    specialists.setdefault(specialist_name, []).append(transcription)
+                    pending_bytes = self._pending_bytes.get(manager_name, 0) + len(
+                        transcription.model_dump_json().encode("utf-8")
+                    )
+                    self._pending_bytes[manager_name] = pending_bytes
+                    if len(pending_filenames) >= self.batch_size or pending_bytes >= self.batch_bytes:
+                        await self._schedule_flush(container, manager_name)
+
+                for manager_name in list(self._pending):
+                    await self._schedule_flush(container, manager_name)
+                await asyncio.gather(*self._flushes)
+        finally:
+            if self._aad_credential:
+                await self._aad_credential.close()
+        logging.info(
+            "Imported %s transcripts (%s skipped, %s duplicates, %s failed) in %.1f seconds",
+            self.imported,
+            self.skipped,
+            self.duplicates,
+            self.failed,
+            time.time() - start,
+        )
+        if self.failures:
+            for manager_name, count, exc in self.failures:
+                logging.error("Failed to import %s transcripts for manager %s: %s", count, manager_name, exc)
+            raise RuntimeError(
+                f"{self.failed} transcripts of {len(self.failures)} manager batches could not be imported"
+            )
+        return self.imported
+
+    async def _get_container(self, client: CosmosClient):
+        try:
+            database = client.get_database_client(self.database_name)
+            await database.read()
+        except exceptions.CosmosResourceNotFoundError:
+            await client.create_database(self.database_name)
+            database = client.get_database_client(self.database_name)
+        return database.get_container_client(self.container_name)
+
+    async def _schedule_flush(self, container, manager_name: str) -> None:
+        specialists = self._pending.pop(manager_name, None)
+        self._pending_bytes.pop(manager_name, None)
+        self._pending_filenames.pop(manager_name, None)
+        if not specialists:
+            return
+        # Acquire the concurrency slot before spawning so reading the source applies backpressure.
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._flush(container, manager_name, specialists))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, container, manager_name: str, specialists: Dict[str, List[Transcription]]) -> None:
+        # Flush tasks are never awaited individually, so failures are recorded here instead of
+        # being left on the task.
+        try:
+            lock = self._manager_locks.setdefault(manager_name, asyncio.Lock())
+            async with lock:
+                charges: List[float] = []
+
+                def record_charge(headers, _result) -> None:
+                    charges.append(float(headers.get("x-ms-request-charge", 0) or 0))
+
+                manager_items = container.query_items(
+                    query="SELECT * FROM c WHERE c.name = @name",
+                    parameters=[{"name": "@name", "value": manager_name}],
+                    response_hook=record_charge,
+                )
+                existing = [item async for item in manager_items]
+                if existing:
+                    manager = ManagerModel(**existing[0])
+                else:
+                    manager = ManagerModel(id=str(uuid.uuid4()), name=manager_name, assistants=[])
+
+                assistants = {assistant.name: assistant for assistant in manager.assistants}
+                existing_filenames = {
+                    transcription.filename
+                    for assistant in manager.assistants
+                    for transcription in assistant.transcriptions
+                }
+                count = 0
+                duplicates = 0
+                for specialist_name, transcriptions in specialists.items():
+                    fresh = [item for item in transcriptions if item.filename not in existing_filenames]
+                    duplicates += len(transcriptions) - len(fresh)
+                    transcriptions = fresh
+                    if not transcriptions:
+                        continue
+                    count += len(transcriptions)
+                    if specialist_name in assistants:
+                        assistants[specialist_name].transcriptions.extend(transcriptions)
+                    else:
+                        specialist = SpecialistItem(
+                            id=str(uuid.uuid4()), name=specialist_name, transcriptions=transcriptions
+                        )
+                        manager.assistants.append(specialist)
+                        assistants[specialist_name] = specialist
+
+                self.duplicates += duplicates
+                if duplicates:
+                    logging.info("Skipped %s transcripts already imported for manager %s", duplicates, manager_name)
+                if not count:
+                    await self.budget.spend(sum(charges))
+                    return
+                document = manager.model_dump()
+                document_bytes = len(json.dumps(document, default=str).encode("utf-8"))
+                if document_bytes > self.MAX_DOCUMENT_BYTES:
+                    raise RuntimeError(
+                        f"Manager document {manager_name} would grow to {document_bytes} bytes, over the"
+                        f" {self.MAX_DOCUMENT_BYTES} byte Cosmos DB item limit"
+                    )
+                await container.upsert_item(document, response_hook=record_charge)
+                await self.budget.spend(sum(charges))
+                self.imported += count
+                logging.info(
+                    "Upserted %s transcripts for manager %s (%.1f RU)", count, manager_name, sum(charges)
+                )
+        except Exception as exc:
+            count = sum(len(transcriptions) for transcriptions in specialists.values())
+            logging.exception("Failed to upsert %s transcripts for manager %s", count, manager_name)
+            self.failed += count
+            self.failures.append((manager_name, count, exc))
+        finally:
+            self._semaphore.release()
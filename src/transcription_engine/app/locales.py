@@ -0,0 +1,136 @@
+"""
+Per-specialist locale statistics used to skip Speech language identification.
+
+Each manager/specialist pair keeps a count of the locales detected in its completed
+transcriptions. When a single locale dominates the history of a pair, new jobs pin that
+locale instead of sending candidate locales, which saves Speech language identification
+time on every file of a single-language queue.
+"""
+
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from azure.core.exceptions import AzureError
+from azure.cosmos import PartitionKey, exceptions
+from azure.cosmos.aio import CosmosClient
+
+
+def _get_env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        logging.warning("Invalid float for %s=%s. Using default %s", name, value, default)
+        return default
+
+
+def split_blob_owner(blob_name: str) -> tuple[str, str]:
+    """Return the upper-cased (manager, specialist) folders of a blob path."""
+    parts = str(os.path.splitext(blob_name)[0]).split("/")
+    manager_name = parts[0] if len(parts) > 1 else "UNKNOWN"
+    specialist_name = parts[1] if len(parts) > 2 else "UNKNOWN"
+    return manager_name.upper(), specialist_name.upper()
+
+
+class LocaleStatistics:
+    """In-memory locale counts per manager/specialist, persisted to a Cosmos container."""
+
+    def __init__(self, client_factory: Callable[[], CosmosClient]) -> None:
+        self._client_factory = client_factory
+        self.database_name = os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job")
+        self.container_name = os.getenv("LOCALE_STATS_CONTAINER", "locale_stats")
+        self.candidate_locales = [
+            locale.strip()
+            for locale in os.getenv("SPEECH_CANDIDATE_LOCALES", "en-US,es-MX").split(",")
+            if locale.strip()
+        ]
+        self.pin_threshold = _get_env_float("LOCALE_PIN_THRESHOLD", 0.9)
+        self.min_samples = int(_get_env_float("LOCALE_PIN_MIN_SAMPLES", 20))
+        self.min_confidence = _get_env_float("LOCALE_PIN_MIN_CONFIDENCE", 0.6)
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._dirty: set[str] = set()
+
+    @staticmethod
+    def _document_id(manager_name: str, specialist_name: str) -> str:
+        # Cosmos ids cannot contain '/', so the pair is joined with '|'.
+        return f"{manager_name}|{specialist_name}"
+
+    async def load(self) -> None:
+        try:
+            async with self._client_factory() as client:
+                container = await self._get_container(client)
+                async for item in container.query_items(
+                    query="SELECT c.id, c.locales FROM c",
+                ):
+                    self._stats[item["id"]] = dict(item.get("locales") or {})
+        except AzureError as exc:
+            logging.warning("Unable to load locale statistics, using candidate locales: %s", exc.message)
+        logging.info("Loaded locale statistics for %s specialists", len(self._stats))
+
+    async def save(self) -> None:
+        if not self._dirty:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        try:
+            async with self._client_factory() as client:
+                container = await self._get_container(client)
+                for document_id in sorted(self._dirty):
+                    manager_name, specialist_name = document_id.split("|", 1)
+                    locales = self._stats[document_id]
+                    await container.upsert_item(
+                        {
+                            "id": document_id,
+                            "manager_name": manager_name,
+                            "specialist_name": specialist_name,
+                            "locales": locales,
+                            "total": sum(locales.values()),
+                            "updated_at_utc": now,
+                        }
+                    )
+        except AzureError as exc:
+            # The counts stay dirty in memory and are retried by the next save.
+            logging.warning("Unable to persist locale statistics: %s", exc.message)
+            return
+        logging.info("Persisted locale statistics for %s specialists", len(self._dirty))
+        self._dirty.clear()
+
+    async def _get_container(self, client: CosmosClient):
+        try:
+            database = client.get_database_client(self.database_name)
+            await database.read()
+        except exceptions.CosmosResourceNotFoundError:
+            await client.create_database(self.database_name)
+            database = client.get_database_client(self.database_name)
+        return await database.create_container_if_not_exists(
+            id=self.container_name,
+            partition_key=PartitionKey(path="/id"),
+        )
+
+    def dominant_locale(self, blob_name: str) -> Optional[str]:
+        """Return the pinned locale for the blob owner, or None when identification is needed."""
+        locales = self._stats.get(self._document_id(*split_blob_owner(blob_name)))
+        if not locales:
+            return None
+        total = sum(locales.values())
+        if total < self.min_samples:
+            return None
+        locale, count = max(locales.items(), key=lambda entry: entry[1])
+        if count / total < self.pin_threshold:
+            return None
+        return locale
+
+    def locales_for(self, blob_name: str) -> List[str]:
+        pinned = self.dominant_locale(blob_name)
+        return [pinned] if pinned else list(self.candidate_locales)
+
+    def record(self, blob_name: str, locale: Optional[str]) -> None:
+        if not locale:
+            return
+        document_id = self._document_id(*split_blob_owner(blob_name))
+        locales = self._stats.setdefault(document_id, {})
+        locales[locale] = locales.get(locale, 0) + 1
+        self._dirty.add(document_id)
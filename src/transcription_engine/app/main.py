@@ -3,6 +3,7 @@ The configuration for the transcription engine communication.
 """
 
 import os
+from typing import Optional
 from urllib.parse import unquote
 
 from dotenv import find_dotenv, load_dotenv
@@ -115,24 +116,27 @@ async def transcribe(
 
 
 @app.get("/manager-data", tags=["Operational Tasks"])
-async def get_manager_data() -> JSONResponse:
+async def get_manager_data(page_size: Optional[int] = None, continuation: Optional[str] = None) -> JSONResponse:
     """
     ## Fetches manager data asynchronously from the database.\n
-    This function retrieves the names of managers from the database and returns them
+    This function retrieves a page of manager names from the database and returns them
     in a JSON response.\n\n
+    **Args**:\n
+        page_size (int): Maximum number of managers to return; all of them when omitted.\n
+        continuation (str): Continuation token returned by the previous page.\n\n
     **Returns**:\n
-        JSONResponse: A response object containing the manager names in JSON format.
+        JSONResponse: A response object containing the manager names and the continuation token.
     """
-    data = await database.load_managers_names()
-    return JSONResponse({"result": data})
+    data, next_token = await database.load_managers_names(page_size, continuation)
+    return JSONResponse({"result": data, "continuation": next_token})
 
 
 @app.get("/transcription-data", tags=["Operational Tasks"])
 async def get_transcription_data(manager: str) -> JSONResponse:
     """
-    ## Asynchronously retrieves transcription data for a given specialist.\n\n
+    ## Asynchronously retrieves transcription data for a given manager.\n\n
     **Args**:\n
-        specialist (str): The name of the specialist, URL-encoded.\n\n
+        manager (str): The name of the manager, URL-encoded.\n\n
     **Returns**:\n
         JSONResponse: A JSON response containing the transcription data.\n\n
     **Raises**:\n
@@ -144,31 +148,54 @@ async def get_transcription_data(manager: str) -> JSONResponse:
 
 
 @app.get("/specialist-data", tags=["Operational Tasks"])
-async def get_specialist_data(specialist: str) -> JSONResponse:
+async def get_specialist_data(
+    specialist: str,
+    page_size: Optional[int] = None,
+    continuation: Optional[str] = None,
+    include_text: bool = True,
+) -> JSONResponse:
     """
     ## Asynchronously retrieves transcription data for a given specialist.\n\n
     **Args**:\n
-        specialist (str): The name of the specialist, URL-encoded.\n\n
+        specialist (str): The name of the specialist, URL-encoded.\n
+        page_size (int): Maximum number of specialist entries to return; all of them when omitted.\n
+        continuation (str): Continuation token returned by the previous page.\n
+        include_text (bool): Whether to include the transcript bodies.\n\n
     **Returns**:\n
-        JSONResponse: A JSON response containing the transcription data.\n\n
+        JSONResponse: A JSON response containing the transcription data and the continuation token.\n\n
     **Raises**:\n
         Exception: If there is an error in loading the data from the database.
     """
     decoded_id = unquote(specialist)
-    data = await database.load_transcription_data(specialist_id=decoded_id)
-    return JSONResponse({"result": data})
+    data, next_token = await database.load_transcription_data(
+        specialist_id=decoded_id,
+        page_size=page_size,
+        continuation=continuation,
+        include_text=include_text,
+    )
+    return JSONResponse({"result": data, "continuation": next_token})
 
 
 @app.get("/transcriptions", tags=["Operational Tasks"])
-async def get_transcriptions() -> JSONResponse:
+async def get_transcriptions(
+    page_size: Optional[int] = None,
+    continuation: Optional[str] = None,
+    include_text: bool = True,
+) -> JSONResponse:
     """
-    ## Asynchronously retrieves transcription data for a given specialist.\n\n
+    ## Asynchronously retrieves a page of manager documents and their transcriptions.\n\n
     **Args**:\n
-        specialist (str): The name of the specialist, URL-encoded.\n\n
+        page_size (int): Maximum number of managers to return; all of them when omitted.\n
+        continuation (str): Continuation token returned by the previous page.\n
+        include_text (bool): Whether to include the transcript bodies.\n\n
     **Returns**:\n
-        JSONResponse: A JSON response containing the transcription data.\n\n
+        JSONResponse: A JSON response containing the transcription data and the continuation token.\n\n
     **Raises**:\n
         Exception: If there is an error in loading the data from the database.
     """
-    data = await database.load_transcriptions()
-    return JSONResponse({"result": data})
+    data, next_token = await database.load_transcriptions(
+        page_size=page_size,
+        continuation=continuation,
+        include_text=include_text,
+    )
+    return JSONResponse({"result": data, "continuation": next_token})
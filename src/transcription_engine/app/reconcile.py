@@ -0,0 +1,170 @@
+"""
+Reconciliation between audio blobs and stored transcripts.
+
+Finds audio blobs with no transcript, transcripts with no audio blob, and transcripts stored
+more than once (for example under different manager documents). Both sides are consumed as
+sorted streams and compared with a sorted merge, so memory stays constant however large
+the container is:
+
+- the Blob service already lists names in lexicographic order;
+- Cosmos cannot order a JOIN across documents, so the projected (filename, document id)
+  pairs are sorted externally: fixed-size chunks are sorted and spilled to temporary files,
+  then merged back lazily with heapq.merge.
+
+Findings are written as NDJSON to the destination container, and the names of missing
+blobs can be handed to the transcription processor.
+"""
+
+import heapq
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from azure.cosmos import exceptions
+from azure.cosmos.aio import CosmosClient
+
+from app.schemas import TranscriptionJobParams
+from app.transcribe import BlobTranscriptionProcessor
+
+AUDIO_EXTENSIONS = ("mp3", "wav", "ogg")
+
+
+class TranscriptionReconciler:
+    """Sorted-merge diff of the origin container against the transcriptions container."""
+
+    def __init__(self, processor: BlobTranscriptionProcessor, chunk_size: int = 100_000) -> None:
+        self.processor = processor
+        self.chunk_size = chunk_size
+        self.database_name = os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job")
+        self.container_name = os.getenv("CONTAINER_NAME", "transcriptions")
+        self.counts: Dict[str, int] = {"missing_transcript": 0, "orphan_transcript": 0, "duplicate_transcript": 0}
+
+    async def run(self, params: TranscriptionJobParams, queue_missing: bool = False) -> Dict[str, int]:
+        start = time.time()
+        report_name = f"reconciliation/{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}.ndjson"
+        with tempfile.TemporaryDirectory(prefix="tayra-reconcile-") as workdir:
+            chunk_paths = await self._spill_sorted_transcripts(workdir)
+            report_path = os.path.join(workdir, "report.ndjson")
+            missing_path = os.path.join(workdir, "missing.txt")
+            with open(report_path, "w", encoding="utf-8") as report, open(missing_path, "w", encoding="utf-8") as missing:
+                async with self.processor._get_blob_service_client() as blob_service_client:
+                    container_client = blob_service_client.get_container_client(params.origin_container)
+                    blob_names = self._iter_blob_names(container_client, params.results_per_page or 5000)
+                    transcripts = self._iter_sorted_transcripts(chunk_paths)
+                    async for finding in self._merge(blob_names, transcripts):
+                        report.write(json.dumps(finding, ensure_ascii=True) + "\n")
+                        self.counts[finding["kind"]] += 1
+                        if finding["kind"] == "missing_transcript":
+                            missing.write(finding["filename"] + "\n")
+
+            summary = {**self.counts, "duration_seconds": time.time() - start, "report": report_name}
+            async with self.processor._get_blob_service_client() as blob_service_client:
+                report_client = blob_service_client.get_blob_client(params.destination_container, report_name)
+                with open(report_path, "rb") as report:
+                    await report_client.upload_blob(report, overwrite=True)
+            logging.info("Reconciliation summary: %s", summary)
+
+            if queue_missing and self.counts["missing_transcript"]:
+                with open(missing_path, encoding="utf-8") as missing:
+                    await self.processor.transcribe_blob_names(
+                        params, (line.rstrip("\n") for line in missing if line.strip())
+                    )
+        return summary
+
+    async def _iter_blob_names(self, container_client, results_per_page: int) -> AsyncIterator[str]:
+        async for blob in container_client.list_blobs(results_per_page=results_per_page):
+            if blob.name.lower().endswith(AUDIO_EXTENSIONS):
+                yield blob.name
+
+    async def _spill_sorted_transcripts(self, workdir: str) -> List[str]:
+        query = (
+            "SELECT t.filename, c.id AS document_id "
+            "FROM c JOIN a IN c.assistants JOIN t IN a.transcriptions"
+        )
+        chunk_paths: List[str] = []
+        chunk: List[Tuple[str, str]] = []
+        async with self.processor._get_cosmos_client() as client:
+            container = await self._get_container(client)
+            async for item in container.query_items(query=query):
+                if not item.get("filename"):
+                    continue
+                chunk.append((item["filename"], item["document_id"]))
+                if len(chunk) >= self.chunk_size:
+                    chunk_paths.append(self._write_chunk(workdir, len(chunk_paths), chunk))
+                    chunk = []
+        if chunk:
+            chunk_paths.append(self._write_chunk(workdir, len(chunk_paths), chunk))
+        logging.info("Spilled transcript filenames into %s sorted chunks", len(chunk_paths))
+        return chunk_paths
+
+    @staticmethod
+    def _write_chunk(workdir: str, index: int, chunk: List[Tuple[str, str]]) -> str:
+        chunk.sort()
+        path = os.path.join(workdir, f"chunk-{index:05d}.ndjson")
+        with open(path, "w", encoding="utf-8") as handle:
+            for filename, document_id in chunk:
+                handle.write(json.dumps([filename, document_id]) + "\n")
+        return path
+
+    @staticmethod
+    def _iter_sorted_transcripts(chunk_paths: List[str]) -> Iterator[Tuple[str, List[str]]]:
+        """Yield (filename, [document ids]) in filename order across all chunks."""
+        handles = [open(path, encoding="utf-8") for path in chunk_paths]
+        try:
+            streams = [(tuple(json.loads(line)) for line in handle) for handle in handles]
+            for filename, group in itertools.groupby(heapq.merge(*streams), key=lambda pair: pair[0]):
+                yield filename, [document_id for _, document_id in group]
+        finally:
+            for handle in handles:
+                handle.close()
+
+    async def _merge(
+        self, blob_names: AsyncIterator[str], transcripts: Iterator[Tuple[str, List[str]]]
+    ) -> AsyncIterator[Dict]:
+        current: Optional[Tuple[str, List[str]]] = next(transcripts, None)
+        async for name in blob_names:
+            while current and current[0] < name:
+                yield {"kind": "orphan_transcript", "filename": current[0], "document_ids": current[1]}
+                duplicate = self._duplicate_finding(current)
+                if duplicate:
+                    yield duplicate
+                current = next(transcripts, None)
+            if current and current[0] == name:
+                duplicate = self._duplicate_finding(current)
+                if duplicate:
+                    yield duplicate
+                current = next(transcripts, None)
+            else:
+                yield {"kind": "missing_transcript", "filename": name}
+        while current:
+            yield {"kind": "orphan_transcript", "filename": current[0], "document_ids": current[1]}
+            duplicate = self._duplicate_finding(current)
+            if duplicate:
+                yield duplicate
+            current = next(transcripts, None)
+
+    @staticmethod
+    def _duplicate_finding(entry: Tuple[str, List[str]]) -> Optional[Dict]:
+        filename, document_ids = entry
+        if len(document_ids) < 2:
+            return None
+        return {
+            "kind": "duplicate_transcript",
+            "filename": filename,
+            "document_ids": document_ids,
+            "different_documents": len(set(document_ids)) > 1,
+        }
+
+    async def _get_container(self, client: CosmosClient):
+        try:
+            database = client.get_database_client(self.database_name)
+            await database.read()
+        except exceptions.CosmosResourceNotFoundError:
+            await client.create_database(self.database_name)
+            database = client.get_database_client(self.database_name)
+        return database.get_container_client(self.container_name)
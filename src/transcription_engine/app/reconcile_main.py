@@ -0,0 +1,75 @@
+"""CLI entry point to reconcile audio blobs against the transcripts stored in Cosmos DB."""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+PACKAGE_ROOT = Path(__file__).resolve().parent.parent
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.append(str(PACKAGE_ROOT))
+
+from app.reconcile import TranscriptionReconciler
+from app.schemas import TranscriptionJobParams
+from app.transcribe import BlobTranscriptionProcessor
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description="Find audio without transcripts, transcripts without audio and duplicated transcripts."
+    )
+    parser.add_argument(
+        "--origin-container",
+        default="audio-files",
+        help="Source container that holds audio blobs (default: audio-files).",
+    )
+    parser.add_argument(
+        "--destination-container",
+        default="transcripts",
+        help="Container where the reconciliation report is written (default: transcripts).",
+    )
+    parser.add_argument(
+        "--results-per-page",
+        type=int,
+        default=5000,
+        help="Number of blobs to fetch per listing page (default: 5000).",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=100_000,
+        help="Transcript filenames sorted in memory before spilling to disk (default: 100000).",
+    )
+    parser.add_argument(
+        "--queue-missing",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Transcribe the audio blobs that have no transcript after the report is written.",
+    )
+    return parser
+
+
+async def run(args: argparse.Namespace) -> None:
+    params = TranscriptionJobParams(
+        origin_container=args.origin_container,
+        destination_container=args.destination_container,
+        results_per_page=args.results_per_page,
+    )
+    processor = BlobTranscriptionProcessor()
+    try:
+        reconciler = TranscriptionReconciler(processor, chunk_size=args.chunk_size)
+        await reconciler.run(params, queue_missing=args.queue_missing)
+    finally:
+        await processor.close()
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    logging.getLogger("azure").setLevel(logging.WARNING)
+    parser = build_parser()
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Retry budget and circuit breaker for calls to the Speech service.
+
+RetryPolicy decides whether a blob still has attempts left and how long it should wait
+(jittered exponential backoff, or the service's Retry-After when larger). CircuitBreaker
+keeps a shared view of endpoint health: after consecutive failures it stops every slot from
+submitting, waits for a cooldown and then lets a single probe request through before
+closing again.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a Retry-After header given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 2.0, max_delay: float = 120.0) -> None:
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def allows(self, attempt: int) -> bool:
+        return attempt < self.max_attempts
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the service's Retry-After."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** max(attempt - 1, 0)))
+        delay = random.uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, cooldown_seconds: float = 60.0, poll_seconds: float = 0.5) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.poll_seconds = poll_seconds
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent. While half-open only one probe is let through."""
+        while True:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self._opened_at + self.cooldown_seconds - time.monotonic()
+                if remaining > 0:
+                    await asyncio.sleep(remaining)
+                    continue
+                self.state = self.HALF_OPEN
+                logging.info("Speech circuit breaker half-open. Sending a probe request.")
+            if not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            await asyncio.sleep(self.poll_seconds)
+
+    def record_success(self) -> None:
+        if self.state != self.CLOSED:
+            logging.info("Speech circuit breaker closed.")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logging.warning(
+                    "Speech circuit breaker open after %s failures. Pausing submissions for %ss.",
+                    self._failures,
+                    self.cooldown_seconds,
+                )
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release(self) -> None:
+        """Give the probe slot back when the probe ended without telling us anything about health."""
+        self._probe_in_flight = False
@@ -12,6 +12,7 @@ Attributes:
 - limit: The optional limit for the transcription job. Defaults to -1.
 - only_failed: The optional flag indicating whether to include only failed transcriptions. Defaults to True.
 - use_cache: The optional flag indicating whether to use cache. Defaults to False.
+- incremental: The optional flag indicating whether to discover only blobs created since the last run. Defaults to False.
 Methods:
 - None
 """
@@ -31,6 +32,7 @@ class TranscriptionJobParams(BaseModel):
         limit (int, optional): The limit for the number of transcription jobs. Defaults to -1.
         only_failed (bool, optional): Flag indicating whether to retrieve only failed transcription jobs. Defaults to True.
         use_cache (bool, optional): Flag indicating whether to use cache. Defaults to False.
+        incremental (bool, optional): Flag indicating whether to discover only blobs created since the last successful run. Runs filtered by manager, specialist or only_failed keep their own watermark. Defaults to False.
     """
 
     origin_container: str
@@ -43,3 +45,4 @@ class TranscriptionJobParams(BaseModel):
     run_evaluation_flow: Optional[bool] = Field(default=True)
     semaphores: Optional[int] = Field(default=10)
     results_per_page: Optional[int] = Field(default=50)
+    incremental: Optional[bool] = Field(default=False)
@@ -0,0 +1,243 @@
+"""
+Splitting of over-length audio into segments that Speech can transcribe in parallel.
+
+WAV files are cut at the quietest point before each segment boundary, found with a
+vectorised energy scan, and every segment extends a little past its cuts on both sides, so a
+word spoken across a cut is heard whole by both neighbours. MP3 files are cut by byte ranges
+on frame sync words, which decoders resynchronise on. Other formats are not split.
+
+After transcription, merge_segment_transcripts shifts every phrase back onto the timeline of
+the original file and keeps each phrase only from the segment whose owned range contains its
+midpoint, which drops the duplicates recognised twice in the overlaps.
+"""
+
+import io
+import math
+import os
+import wave
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+TICKS_PER_SECOND = 10_000_000
+
+# Bitrates (kbps) indexed by the 4-bit bitrate field of an MP3 frame header.
+_MP3_BITRATES = {
+    "mpeg1": [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0],
+    "mpeg2": [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0],
+}
+
+
+@dataclass
+class AudioSegment:
+    """A piece of the original file.
+
+    start_seconds is where the segment audio begins on the original timeline, and
+    owned_from_seconds/owned_until_seconds are the cuts around it: phrases centred between them
+    belong to this segment, the rest of its audio overlaps the neighbours. They are None when
+    the timing is only known after transcription (byte-range cuts), and owned_until_seconds
+    is also None for the last segment.
+    """
+
+    index: int
+    data: bytes
+    extension: str
+    start_seconds: Optional[float]
+    owned_from_seconds: Optional[float]
+    owned_until_seconds: Optional[float] = None
+
+
+def _wav_samples(frames: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Decode PCM frames into a mono float array."""
+    if sample_width == 1:
+        samples = np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(frames, dtype="<i2").astype(np.float32)
+    elif sample_width == 3:
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        packed = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        samples = np.where(packed & 0x800000, packed - 0x1000000, packed).astype(np.float32)
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype="<i4").astype(np.float32)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width}")
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+
+def find_low_energy_cuts(
+    samples: np.ndarray,
+    rate: int,
+    segment_seconds: float,
+    search_seconds: float,
+    window_seconds: float = 0.05,
+) -> List[int]:
+    """Return the frame indexes where segments start, always including 0.
+
+    Each cut is the quietest analysis window within search_seconds before the point where the
+    current segment would exceed segment_seconds, so no segment is longer than that.
+    """
+    total_frames = len(samples)
+    segment_frames = int(segment_seconds * rate)
+    window = max(1, int(window_seconds * rate))
+    n_windows = total_frames // window
+    energy = np.square(samples[: n_windows * window]).reshape(n_windows, window).mean(axis=1)
+
+    cuts = [0]
+    while total_frames - cuts[-1] > segment_frames:
+        target = cuts[-1] + segment_frames
+        low = max(cuts[-1] + window, target - int(search_seconds * rate)) // window
+        high = min(target // window, n_windows)
+        if high <= low:
+            cuts.append(target)
+            continue
+        cuts.append((low + int(np.argmin(energy[low:high]))) * window)
+    return cuts
+
+
+def split_wav(
+    data: bytes, segment_seconds: float, overlap_seconds: float, search_seconds: float
+) -> List[AudioSegment]:
+    with wave.open(io.BytesIO(data), "rb") as reader:
+        params = reader.getparams()
+        frames = reader.readframes(params.nframes)
+
+    frame_width = params.sampwidth * params.nchannels
+    rate = params.framerate
+    samples = _wav_samples(frames, params.sampwidth, params.nchannels)
+    # Leave room for the overlap on both sides so no segment exceeds segment_seconds.
+    cuts = find_low_energy_cuts(samples, rate, max(1.0, segment_seconds - 2 * overlap_seconds), search_seconds)
+    total_frames = len(frames) // frame_width
+    overlap_frames = int(overlap_seconds * rate)
+
+    segments = []
+    for index, cut in enumerate(cuts):
+        start = max(0, cut - overlap_frames)
+        next_cut = cuts[index + 1] if index + 1 < len(cuts) else None
+        end = total_frames if next_cut is None else min(total_frames, next_cut + overlap_frames)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as writer:
+            writer.setparams(params)
+            writer.writeframes(frames[start * frame_width:end * frame_width])
+        segments.append(
+            AudioSegment(
+                index=index,
+                data=buffer.getvalue(),
+                extension=".wav",
+                start_seconds=start / rate,
+                owned_from_seconds=cut / rate,
+                owned_until_seconds=None if next_cut is None else next_cut / rate,
+            )
+        )
+    return segments
+
+
+def _mp3_sync_offsets(data: bytes) -> np.ndarray:
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return np.flatnonzero((buffer[:-1] == 0xFF) & ((buffer[1:] & 0xE0) == 0xE0))
+
+
+def estimate_mp3_seconds(data: bytes, sync_offsets: np.ndarray) -> Optional[float]:
+    """Estimate the duration from the bitrate of the first valid frame header."""
+    for offset in sync_offsets[:64]:
+        if offset + 3 >= len(data):
+            break
+        header = data[offset + 1:offset + 3]
+        version_bits = (header[0] >> 3) & 0x03
+        layer_bits = (header[0] >> 1) & 0x03
+        if layer_bits != 0x01 or version_bits == 0x01:
+            continue
+        table = _MP3_BITRATES["mpeg1" if version_bits == 0x03 else "mpeg2"]
+        bitrate = table[(header[1] >> 4) & 0x0F]
+        if bitrate:
+            return len(data) * 8 / (bitrate * 1000)
+    return None
+
+
+def split_mp3(data: bytes, segment_seconds: float) -> List[AudioSegment]:
+    sync_offsets = _mp3_sync_offsets(data)
+    duration = estimate_mp3_seconds(data, sync_offsets)
+    if not duration or not len(sync_offsets):
+        return []
+    n_segments = max(2, math.ceil(duration / segment_seconds))
+    targets = (np.arange(1, n_segments) * len(data)) // n_segments
+    cut_indexes = np.minimum(np.searchsorted(sync_offsets, targets), len(sync_offsets) - 1)
+    cuts = [0, *sorted(set(int(offset) for offset in sync_offsets[cut_indexes])), len(data)]
+    return [
+        AudioSegment(
+            index=index,
+            data=data[start:end],
+            extension=".mp3",
+            start_seconds=0.0 if index == 0 else None,
+            owned_from_seconds=0.0 if index == 0 else None,
+        )
+        for index, (start, end) in enumerate(zip(cuts[:-1], cuts[1:]))
+        if end > start
+    ]
+
+
+def split_audio(
+    file_name: str,
+    data: bytes,
+    segment_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float,
+) -> List[AudioSegment]:
+    """Split the audio by format. Returns an empty list when the format cannot be split."""
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension == ".wav":
+        return split_wav(data, segment_seconds, overlap_seconds, search_seconds)
+    if extension == ".mp3":
+        return split_mp3(data, segment_seconds)
+    return []
+
+
+def _payload_duration_ticks(payload: dict) -> int:
+    if payload.get("durationInTicks"):
+        return int(payload["durationInTicks"])
+    if payload.get("durationMilliseconds"):
+        return int(payload["durationMilliseconds"]) * 10_000
+    phrases = payload.get("recognizedPhrases") or []
+    return max(
+        (int(phrase.get("offsetInTicks", 0)) + int(phrase.get("durationInTicks", 0)) for phrase in phrases),
+        default=0,
+    )
+
+
+def merge_segment_transcripts(segments: List[AudioSegment], payloads: List[dict]) -> dict:
+    """Merge per-segment Speech transcripts into a single transcript on the original timeline.
+
+    Returns a payload with the same recognizedPhrases/combinedRecognizedPhrases layout as a
+    Speech batch transcript so it can be consumed like one.
+    """
+    merged_phrases = []
+    elapsed_ticks = 0
+    for segment, payload in zip(segments, payloads):
+        owned_until_ticks = None
+        if segment.start_seconds is None:
+            start_ticks = owned_from_ticks = elapsed_ticks
+        else:
+            start_ticks = int(segment.start_seconds * TICKS_PER_SECOND)
+            owned_from_ticks = int(segment.owned_from_seconds * TICKS_PER_SECOND)
+            if segment.owned_until_seconds is not None:
+                owned_until_ticks = int(segment.owned_until_seconds * TICKS_PER_SECOND)
+        for phrase in payload.get("recognizedPhrases") or []:
+            offset = int(phrase.get("offsetInTicks", 0)) + start_ticks
+            midpoint = offset + int(phrase.get("durationInTicks", 0)) // 2
+            if segment.index > 0 and midpoint < owned_from_ticks:
+                continue
+            if owned_until_ticks is not None and midpoint >= owned_until_ticks:
+                continue
+            merged_phrases.append({**phrase, "offsetInTicks": offset, "segment": segment.index})
+        elapsed_ticks = start_ticks + _payload_duration_ticks(payload)
+
+    merged_phrases.sort(key=lambda phrase: phrase["offsetInTicks"])
+    text_segments = [
+        ((phrase.get("nBest") or [{}])[0].get("display") or "").strip() for phrase in merged_phrases
+    ]
+    return {
+        "durationInTicks": elapsed_ticks,
+        "recognizedPhrases": merged_phrases,
+        "combinedRecognizedPhrases": [{"display": " ".join(text for text in text_segments if text)}],
+    }
@@ -0,0 +1,78 @@
+"""
+Stage-level latency tracking for transcribed blobs.
+
+Each blob task gets its own timings dict through a context variable, so the Speech, storage
+and Cosmos helpers can record how long their stage took without passing the dict around.
+Stages hit more than once for the same blob (retried polls, segments of a split file)
+are summed.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterable, Iterator, Optional
+
+import numpy as np
+
+STAGES = (
+    "listing",
+    "validation",
+    "audio_download",
+    "sas_generation",
+    "breaker_wait",
+    "submit",
+    "queue_wait",
+    "recognition",
+    "files_listing",
+    "transcript_download",
+    "persistence",
+)
+
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def start_blob_timings(initial: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+    """Start a fresh timings dict for the current task and return it."""
+    timings = dict(initial or {})
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings() -> Dict[str, float]:
+    return dict(_current_timings.get() or {})
+
+
+def add_stage(name: str, seconds: float) -> None:
+    timings = _current_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + max(seconds, 0.0)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        add_stage(name, time.perf_counter() - start)
+
+
+def summarize_stage_timings(per_blob: Iterable[Optional[Dict[str, float]]]) -> Dict[str, Dict[str, float]]:
+    """Aggregate per-blob stage timings into count, mean, p50, p95 and p99 per stage."""
+    samples: Dict[str, list] = {}
+    for timings in per_blob:
+        for name, seconds in (timings or {}).items():
+            samples.setdefault(name, []).append(seconds)
+
+    summary = {}
+    for name in sorted(samples, key=lambda key: STAGES.index(key) if key in STAGES else len(STAGES)):
+        values = np.asarray(samples[name], dtype=np.float64)
+        p50, p95, p99 = np.percentile(values, [50, 95, 99])
+        summary[name] = {
+            "count": int(values.size),
+            "mean": float(values.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+        }
+    return summary
@@ -4,19 +4,22 @@ import json
 import logging
 import os
 import sys
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 import time
 import uuid
+import wave
 from logging.handlers import QueueHandler, QueueListener
 from queue import Queue
-from typing import List
+from typing import Iterable, List
 
 import httpx
 from azure.cosmos.aio import CosmosClient
 from azure.cosmos import exceptions
+from azure.identity import DefaultAzureCredential as SyncDefaultAzureCredential
 from azure.identity.aio import DefaultAzureCredential
-from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+from azure.storage.blob import BlobSasPermissions, UserDelegationKey, generate_blob_sas
+from azure.core.exceptions import ResourceExistsError
 from azure.storage.blob.aio import BlobClient, BlobServiceClient
 from dotenv import find_dotenv, load_dotenv
 
@@ -24,6 +27,13 @@ PACKAGE_ROOT = Path(__file__).resolve().parent.parent
 if str(PACKAGE_ROOT) not in sys.path:
     sys.path.append(str(PACKAGE_ROOT))
 
+from app.cache import query_cache
+from app.discovery import ChangeFeedClient, IncrementalDiscovery
+from app.exceptions import SpeechTransientError
+from app.locales import LocaleStatistics
+from app.resilience import CircuitBreaker, RetryPolicy, parse_retry_after
+from app.segments import merge_segment_transcripts, split_audio
+from app.timings import add_stage, current_timings, stage, start_blob_timings, summarize_stage_timings
 from app.schemas import TranscriptionJobParams, Transcription, SpecialistItem, ManagerModel
 
 load_dotenv(find_dotenv())
@@ -32,6 +42,10 @@ logging.getLogger('azure').setLevel(logging.WARNING)
 class BlobTranscriptionProcessor:
     BATCH_SIZE = 50
     SHORT_CALL_TEXT = "Call too short or not answered."
+    TOO_LONG_TEXT = "Audio file too big. Manual processing required."
+    RETRYABLE_STATUS_CODES = {408, 429, 499, 500, 502, 503, 504}
+    SAS_EXPIRY_MINUTES = 60
+    TRANSCRIBED_LOOKUP_CHUNK = 200
 
     def __init__(self):
         self.ai_speech_key = os.getenv("AI_SPEECH_KEY", "")
@@ -39,8 +53,33 @@ class BlobTranscriptionProcessor:
         self.cosmos_key = os.getenv("COSMOS_KEY", "")
         self.storage_connection_string  = os.getenv("AZURE_STORAGE_CONNECTION_STRING", "")
         self.storage_account_name, self.storage_account_key = self._parse_storage_connection_string(self.storage_connection_string)
+        self.storage_account_name = self.storage_account_name or os.getenv("AZURE_STORAGE_ACCOUNT_NAME")
+        self.storage_account_url = os.getenv("AZURE_STORAGE_ACCOUNT_URL", "")
         self.use_aad_auth = self._should_use_aad_auth()
         self._aad_credential: DefaultAzureCredential | None = None
+        self._sync_aad_credential: SyncDefaultAzureCredential | None = None
+        self._cosmos_client: CosmosClient | None = None
+        self.delegation_key_hours = _get_env_int("STORAGE_DELEGATION_KEY_HOURS", 6)
+        self._user_delegation_key: UserDelegationKey | None = None
+        self._user_delegation_key_expiry: datetime | None = None
+        self._user_delegation_key_lock = asyncio.Lock()
+        self.locale_stats = LocaleStatistics(self._get_cosmos_client)
+        self.scratch_container = os.getenv("TRANSCRIPTION_SCRATCH_CONTAINER", "transcription-scratch")
+        self.segment_seconds = _get_env_int("SPEECH_SEGMENT_SECONDS", 1800)
+        self.segment_overlap_seconds = _get_env_int("SPEECH_SEGMENT_OVERLAP_SECONDS", 2)
+        self.segment_search_seconds = _get_env_int("SPEECH_SEGMENT_SEARCH_SECONDS", 15)
+        self.retry_policy = RetryPolicy(
+            max_attempts=_get_env_int("SPEECH_RETRY_MAX_ATTEMPTS", 5),
+            base_delay=_get_env_int("SPEECH_RETRY_BASE_SECONDS", 2),
+            max_delay=_get_env_int("SPEECH_RETRY_MAX_SECONDS", 120),
+        )
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=_get_env_int("SPEECH_BREAKER_FAILURES", 5),
+            cooldown_seconds=_get_env_int("SPEECH_BREAKER_COOLDOWN_SECONDS", 60),
+        )
+        self.retry_queue: list[tuple[float, BlobClient]] = []
+        self._discovery_timings: dict[str, dict[str, float]] = {}
+        self._retry_attempts: dict[str, int] = {}
         self.failed_files = set()
 
     async def __call__(self, params: TranscriptionJobParams):
@@ -50,8 +89,18 @@ class BlobTranscriptionProcessor:
             await self.process_blob_storage(params)
         finally:
             listener.stop()
-            if self._aad_credential:
-                await self._aad_credential.close()
+            await self.close()
+
+    async def close(self):
+        if self._cosmos_client:
+            await self._cosmos_client.close()
+            self._cosmos_client = None
+        if self._aad_credential:
+            await self._aad_credential.close()
+            self._aad_credential = None
+        if self._sync_aad_credential:
+            self._sync_aad_credential.close()
+            self._sync_aad_credential = None
 
     async def init_logger(self):
         log = logging.getLogger()
@@ -118,11 +167,64 @@ class BlobTranscriptionProcessor:
         tasks = []
         async with asyncio.TaskGroup() as group:
             for blob_client in blob_batch:
-                task = group.create_task(
-                    self.transcribe_and_save(blob_client, blob_client.blob_name)
-                )
+                task = group.create_task(self._transcribe_or_defer(blob_client))
                 tasks.append(task)
-        return [task.result() for task in tasks]
+        return [task.result() for task in tasks if task.result() is not None]
+
+    async def _transcribe_or_defer(self, blob_client: BlobClient):
+        """Transcribe a blob, moving it to the retry queue on transient Speech failures.
+
+        Deferred blobs release their batch slot immediately instead of sleeping in it. Once a
+        blob exhausts its attempt budget it is saved as a failed call.
+        """
+        blob_name = blob_client.blob_name
+        start_blob_timings(self._discovery_timings.pop(blob_name, None))
+        try:
+            return await self.transcribe_and_save(blob_client, blob_name)
+        except SpeechTransientError as exc:
+            attempt = self._retry_attempts.get(blob_name, 0) + 1
+            self._retry_attempts[blob_name] = attempt
+            if not self.retry_policy.allows(attempt):
+                logging.error("Retry budget exhausted for blob %s after %s attempts: %s", blob_name, attempt, exc)
+                await self.save_transcription(
+                    blob_name,
+                    self.SHORT_CALL_TEXT,
+                    {"file_name": str(blob_name).lower().replace(" ", "_"), "attempts": attempt},
+                    short_reason="retry_budget_exhausted",
+                )
+                return {"file_name": blob_name, "failure_reason": "retry_budget_exhausted"}
+            delay = self.retry_policy.backoff(attempt, exc.retry_after)
+            logging.warning("Deferring blob %s for %.1fs (attempt %s): %s", blob_name, delay, attempt, exc)
+            self.retry_queue.append((time.monotonic() + delay, blob_client))
+            return None
+
+    async def _drain_retry_queue(self, blob_service_client: BlobServiceClient) -> list:
+        """Process deferred blobs as they become due until the queue is empty."""
+        transcription_metadata = []
+        while self.retry_queue:
+            self.retry_queue.sort(key=lambda entry: entry[0])
+            wait = self.retry_queue[0][0] - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            now = time.monotonic()
+            due = [entry for entry in self.retry_queue if entry[0] <= now][: self.BATCH_SIZE]
+            self.retry_queue = self.retry_queue[len(due):]
+            logging.info("Retrying %s deferred blobs, %s still queued", len(due), len(self.retry_queue))
+            await self._ensure_user_delegation_key(blob_service_client)
+            transcription_metadata.extend(await self._process_blob_batch([blob_client for _, blob_client in due]))
+        return transcription_metadata
+
+    @staticmethod
+    def _discovery_scope(params: TranscriptionJobParams) -> str | None:
+        """Watermark scope of a filtered run, so it never advances the container-wide watermark."""
+        parts = []
+        if params.manager_name:
+            parts.append(f"manager={params.manager_name}")
+        if params.specialist_name:
+            parts.append(f"specialist={params.specialist_name}")
+        if params.only_failed:
+            parts.append("only_failed")
+        return ",".join(parts) or None
 
     def _set_prefix(self, params: TranscriptionJobParams):
         prefix = ""
@@ -135,15 +237,45 @@ class BlobTranscriptionProcessor:
     async def _process_batch(self, prefix, checked_transcriptions_cache, results_per_page, params: TranscriptionJobParams):
         counter = 0
         transcription_metadata = []
-        async with BlobServiceClient.from_connection_string(self.storage_connection_string) as blob_service_client:
+        async with self._get_blob_service_client() as blob_service_client:
             container_client = blob_service_client.get_container_client(params.origin_container)
+            await self._ensure_user_delegation_key(blob_service_client)
+
+            discovery = None
+            if params.incremental:
+                discovery = IncrementalDiscovery(
+                    blob_service_client,
+                    params.origin_container,
+                    params.destination_container,
+                    change_feed_factory=self._get_change_feed_client if ChangeFeedClient else None,
+                    scope=self._discovery_scope(params),
+                )
+                await discovery.load()
+                blobs = discovery.iter_blobs(container_client, results_per_page)
+            else:
+                blobs = container_client.list_blobs(results_per_page=results_per_page)
 
             batch = []
-            async for blob_page in container_client.list_blobs(results_per_page=results_per_page).by_page():
-
-                async for blob in blob_page:
-                    if not await self.is_blob_valid(blob, checked_transcriptions_cache, blob_service_client, params):
-                        continue
+            listing_completed = True
+            mark = time.perf_counter()
+            async for page in _iter_pages(blobs, results_per_page):
+                listing = (time.perf_counter() - mark) / len(page)
+                candidates = []
+                for blob in page:
+                    validation_started = time.perf_counter()
+                    if await self.is_blob_valid(blob, checked_transcriptions_cache, blob_service_client, params):
+                        candidates.append((blob, time.perf_counter() - validation_started))
+                if discovery and candidates:
+                    # The watermark overlaps the previous run, so files it already transcribed come
+                    # back; they are dropped with one lookup per page.
+                    transcribed = await self._transcribed_filenames([blob.name for blob, _ in candidates])
+                    for blob, _ in candidates:
+                        if blob.name in transcribed:
+                            logging.info("Skipping blob %s as it has already been transcribed.\n", blob.name)
+                    candidates = [(blob, validation) for blob, validation in candidates if blob.name not in transcribed]
+
+                for blob, validation in candidates:
+                    self._discovery_timings[blob.name] = {"listing": listing, "validation": validation}
 
                     blob_client = container_client.get_blob_client(blob.name)
                     batch.append(blob_client)
@@ -151,22 +283,50 @@ class BlobTranscriptionProcessor:
                     logging.warning("Current batch size: %s. \n", len(batch))
 
                     if len(batch) >= self.BATCH_SIZE:
+                        await self._ensure_user_delegation_key(blob_service_client)
                         batch_metadata = await self._process_blob_batch(batch)
                         transcription_metadata.extend(batch_metadata)
                         batch.clear()
 
                     if counter >= (params.limit or -1) > 1:
-                        if batch:
-                            batch_metadata = await self._process_blob_batch(batch)
-                            transcription_metadata.extend(batch_metadata)
+                        listing_completed = False
                         break
+                if not listing_completed:
+                    break
+                mark = time.perf_counter()
 
             if batch:
+                await self._ensure_user_delegation_key(blob_service_client)
                 batch_metadata = await self._process_blob_batch(batch)
                 transcription_metadata.extend(batch_metadata)
                 batch.clear()
+
+            transcription_metadata.extend(await self._drain_retry_queue(blob_service_client))
+            if discovery and listing_completed:
+                await discovery.commit()
         return transcription_metadata, counter
 
+    async def transcribe_blob_names(self, params: TranscriptionJobParams, blob_names: Iterable[str]) -> list:
+        """Transcribe an explicit list of blobs from the origin container, skipping discovery and validation."""
+        await self.locale_stats.load()
+        transcription_metadata = []
+        async with self._get_blob_service_client() as blob_service_client:
+            container_client = blob_service_client.get_container_client(params.origin_container)
+            batch = []
+            for blob_name in blob_names:
+                batch.append(container_client.get_blob_client(blob_name))
+                if len(batch) >= self.BATCH_SIZE:
+                    await self._ensure_user_delegation_key(blob_service_client)
+                    transcription_metadata.extend(await self._process_blob_batch(batch))
+                    batch.clear()
+            if batch:
+                await self._ensure_user_delegation_key(blob_service_client)
+                transcription_metadata.extend(await self._process_blob_batch(batch))
+            transcription_metadata.extend(await self._drain_retry_queue(blob_service_client))
+        await self.locale_stats.save()
+        logging.info("Transcribed %s queued blobs", len(transcription_metadata))
+        return transcription_metadata
+
     async def process_blob_storage(self, params: TranscriptionJobParams):
         logging.info("Running for manager %s and specialist %s", params.manager_name, params.specialist_name)
         logging.info("Starting transcription process for container %s with limit %s", params.origin_container, params.limit)
@@ -175,6 +335,7 @@ class BlobTranscriptionProcessor:
         logging.info("Starting job on %s", start_overall)
 
         await self.get_failed_transcriptions()
+        await self.locale_stats.load()
         checked_transcriptions_cache = {}
         prefix = self._set_prefix(params)
 
@@ -183,6 +344,7 @@ class BlobTranscriptionProcessor:
             results_per_page = self.BATCH_SIZE
 
         transcription_metadata, counter = await self._process_batch(prefix, checked_transcriptions_cache, results_per_page, params)
+        await self.locale_stats.save()
 
         end_overall = time.time()
         logging.info("Job finished on %s", end_overall)
@@ -198,6 +360,7 @@ class BlobTranscriptionProcessor:
             "transcription_duration": overall_duration,
             "processed_files": counter,
             "transcriptions": transcription_metadata,
+            "stage_latency": summarize_stage_timings(item.get("stages") for item in transcription_metadata),
         }
 
         logging.info("Metadata: %s", transcription_metadata)
@@ -205,7 +368,7 @@ class BlobTranscriptionProcessor:
         metadata_json = json.dumps(metadata, ensure_ascii=True)
         output_file = f"metadata-{str(time.time())}.json"
 
-        async with BlobServiceClient.from_connection_string(self.storage_connection_string) as blob_service_client:
+        async with self._get_blob_service_client() as blob_service_client:
             metadata_blob_client = blob_service_client.get_blob_client(
             container=params.destination_container, blob=output_file
             )
@@ -272,8 +435,9 @@ class BlobTranscriptionProcessor:
             start_transcription = time.time()
             logging.info("Transcribing blob %s at %s", blob_name, start_transcription)
 
-            download_stream = await blob_client.download_blob()
-            file_stream = await download_stream.read()
+            with stage("audio_download"):
+                download_stream = await blob_client.download_blob()
+                file_stream = await download_stream.read()
 
             transcription_result = await self.transcribe_file(blob_client, blob_name, io.BytesIO(file_stream))
             logging.info("Transcribing blob %s took %s", blob_name, time.time() - start_transcription)
@@ -286,29 +450,59 @@ class BlobTranscriptionProcessor:
                 "file_size": blob_properties.size,
                 "transcription_duration": time.time() - start_transcription,
             }
+            if transcription_result.get("segments"):
+                transcription_metadata["segments"] = transcription_result["segments"]
+            if transcription_result.get("locale"):
+                transcription_metadata["locale"] = transcription_result["locale"]
+                transcription_metadata["locale_confidence"] = transcription_result.get("locale_confidence")
+                self.locale_stats.record(blob_name, transcription_result["locale"])
             if short_reason:
                 transcription_metadata["short_reason"] = short_reason
                 logging.info("Blob %s marked as short call due to %s", blob_name, short_reason)
             logging.info("Metadata for blob %s: %s", blob_name, transcription_metadata)
 
             start_saving = time.time()
-            await self.save_transcription(
-                blob_name,
-                transcription_text,
-                transcription_metadata,
-                short_reason=short_reason,
-            )
+            with stage("persistence"):
+                await self.save_transcription(
+                    blob_name,
+                    transcription_text,
+                    transcription_metadata,
+                    short_reason=short_reason,
+                )
 
             logging.debug("Transcription result for %s: %s", blob_name, transcription_text)
             return {
                 "file_name": blob_name,
                 "file_size": blob_properties.size,
                 "saving_duration": time.time() - start_saving,
+                "stages": current_timings(),
             }
         except Exception as exc:
             logging.error("Error processing blob %s: %s", blob_name, exc)
             raise exc
 
+    async def _transcribed_filenames(self, blob_names: list[str]) -> set[str]:
+        """Return the names among ``blob_names`` that already have a transcript, one query per chunk."""
+        query = (
+            "SELECT DISTINCT VALUE t.filename FROM c JOIN a IN c.assistants JOIN t IN a.transcriptions"
+            " WHERE ARRAY_CONTAINS(@names, t.filename)"
+        )
+        if self._cosmos_client is None:
+            self._cosmos_client = self._get_cosmos_client()
+        database = self._cosmos_client.get_database_client(os.getenv("COSMOS_DB_TRANSCRIPTION", "transcription_job"))
+        container = database.get_container_client(os.getenv("CONTAINER_NAME", "transcriptions"))
+        transcribed: set[str] = set()
+        for start in range(0, len(blob_names), self.TRANSCRIBED_LOOKUP_CHUNK):
+            names = blob_names[start : start + self.TRANSCRIBED_LOOKUP_CHUNK]
+            try:
+                async for filename in container.query_items(
+                    query=query, parameters=[{"name": "@names", "value": names}]
+                ):
+                    transcribed.add(filename)
+            except exceptions.CosmosResourceNotFoundError:
+                return transcribed
+        return transcribed
+
     async def check_finished_transcriptions(
         self,
         blob_service_client: BlobServiceClient, destination_container: str, blob_name: str
@@ -328,8 +522,16 @@ class BlobTranscriptionProcessor:
             logging.warning("No cached transcription found for blob %s. Exception: %s", blob_name, exc)
             return None
 
-    async def transcribe_file(self, blob_client, file_name: str, file_data: io.BytesIO, sem: int = 20):
-        sas_url = self._generate_blob_sas_url(blob_client)
+    async def transcribe_file(
+        self,
+        blob_client,
+        file_name: str,
+        file_data: io.BytesIO,
+        sem: int = 20,
+        locales: list[str] | None = None,
+    ):
+        with stage("sas_generation"):
+            sas_url = self._generate_blob_sas_url(blob_client)
         if not sas_url:
             logging.error("Unable to generate SAS URL for blob %s", file_name)
             return self._short_call_result("sas_generation_failed")
@@ -339,7 +541,8 @@ class BlobTranscriptionProcessor:
             logging.error("AI_SPEECH_URL is not configured. Skipping blob %s", file_name)
             return self._short_call_result("missing_endpoint")
 
-        payload = self._build_batch_transcription_payload(file_name, sas_url)
+        locales = locales or self.locale_stats.locales_for(file_name)
+        payload = self._build_batch_transcription_payload(file_name, sas_url, locales)
         headers = {
             "Ocp-Apim-Subscription-Key": self.ai_speech_key,
             "Content-Type": "application/json",
@@ -349,37 +552,53 @@ class BlobTranscriptionProcessor:
         async with asyncio.Semaphore(sem):
             async with httpx.AsyncClient(timeout=None) as client:
                 try:
-                    response = await client.post(speech_url, headers=headers, json=payload)
-                    response.raise_for_status()
-                    job_location = response.headers.get("Location") or response.headers.get("location")
-                    if not job_location:
+                    job_result = await self._submit_batch_job(client, speech_url, headers, payload)
+                    if job_result is None:
                         logging.error("Speech batch job missing Location header for %s", file_name)
                         return self._short_call_result("missing_location")
 
-                    job_result = await self._poll_transcription_job(client, job_location, headers)
                     status = job_result.get("status")
                     logging.info("Speech batch job status for %s: %s", file_name, status)
 
                     if status != "Succeeded":
                         error_message = job_result.get("error", {}).get("message", "batch_failed")
+                        if "Maximal audio length exceeded" in error_message:
+                            logging.warning("Speech batch job for %s exceeded the maximum length. Splitting.", file_name)
+                            return await self._transcribe_in_segments(
+                                client, speech_url, headers, blob_client, file_name, file_data, locales
+                            )
                         logging.error("Speech batch job failed for %s: %s", file_name, error_message)
                         return self._short_call_result("batch_failed")
 
-                    transcript_text = await self._download_batch_transcript(client, job_result, headers)
-                    if not transcript_text:
+                    transcript = await self._download_batch_transcript(client, job_result, headers)
+                    if self._needs_language_identification(transcript, locales):
+                        logging.info(
+                            "Low confidence with pinned locale %s for %s. Retrying with language identification.",
+                            locales[0],
+                            file_name,
+                        )
+                        return await self.transcribe_file(
+                            blob_client, file_name, file_data, locales=self.locale_stats.candidate_locales
+                        )
+                    if not transcript:
                         return self._short_call_result("empty_transcript")
 
-                    return {"text": transcript_text}
+                    return {
+                        "text": transcript["text"],
+                        "locale": transcript.get("locale") or (locales[0] if len(locales) == 1 else None),
+                        "locale_confidence": transcript.get("confidence"),
+                    }
                 except httpx.NetworkError as exc:
-                    logging.error("Network Error: %s. Trying Again.", str(exc))
-                    await asyncio.sleep(0.5)
-                    return await self.transcribe_file(blob_client, file_name, file_data)
+                    logging.error("Network Error: %s. Deferring blob %s.", str(exc), file_name)
+                    raise SpeechTransientError(f"network error: {exc}") from exc
                 except httpx.HTTPStatusError as exc:
                     status_code = exc.response.status_code if exc.response else None
-                    if status_code in [503, 429, 500, 408, 499]:
-                        logging.error("Server error %s: %s. Trying Again.", status_code, str(exc))
-                        await asyncio.sleep(60 if status_code == 429 else 120)
-                        return await self.transcribe_file(blob_client, file_name, file_data)
+                    if status_code in self.RETRYABLE_STATUS_CODES:
+                        logging.error("Server error %s: %s. Deferring blob %s.", status_code, str(exc), file_name)
+                        raise SpeechTransientError(
+                            f"status {status_code}",
+                            retry_after=parse_retry_after(exc.response.headers.get("Retry-After")),
+                        ) from exc
                     if status_code == 400 and "EmptyAudioFile" in str(exc.response.content if exc.response else ""):
                         logging.warning("Bad Request: %s. Signaling empty audio file.", str(exc))
                         return self._short_call_result("empty_audio_file")
@@ -387,10 +606,14 @@ class BlobTranscriptionProcessor:
                         logging.warning("Bad Request: %s. Signaling invalid audio file.", str(exc))
                         return {"text": "Invalid Audio File."}
                     if status_code == 400 and "Maximal audio length exceeded" in str(exc.response.content if exc.response else ""):
-                        logging.warning("Bad Request: %s. Signaling too large file.", str(exc))
-                        return {"text": "Audio file too big. Manual processing required."}
+                        logging.warning("Bad Request: %s. Splitting too large file.", str(exc))
+                        return await self._transcribe_in_segments(
+                            client, speech_url, headers, blob_client, file_name, file_data, locales
+                        )
                     logging.critical("Unhandled HTTP error: %s.", str(exc.response.content if exc.response else exc))
                     raise exc
+                except SpeechTransientError:
+                    raise
                 except Exception as exc:
                     logging.critical("Unhandled error: %s.", str(exc))
                     raise exc
@@ -406,19 +629,52 @@ class BlobTranscriptionProcessor:
             parts[key.strip()] = value.strip()
         return parts.get("AccountName"), parts.get("AccountKey")
 
-    def _generate_blob_sas_url(self, blob_client: BlobClient, expiry_minutes: int = 60) -> str | None:
-        if not self.storage_account_name or not self.storage_account_key:
+    def _generate_blob_sas_url(self, blob_client: BlobClient, expiry_minutes: int = SAS_EXPIRY_MINUTES) -> str | None:
+        account_name = self.storage_account_name or blob_client.account_name
+        if self.storage_account_key:
+            signing_kwargs = {"account_key": self.storage_account_key}
+        elif self._user_delegation_key:
+            signing_kwargs = {"user_delegation_key": self._user_delegation_key}
+        else:
+            return None
+        if not account_name:
             return None
         sas_token = generate_blob_sas(
-            account_name=self.storage_account_name,
+            account_name=account_name,
             container_name=blob_client.container_name,
             blob_name=blob_client.blob_name,
-            account_key=self.storage_account_key,
             permission=BlobSasPermissions(read=True),
-            expiry=datetime.utcnow() + timedelta(minutes=expiry_minutes),
+            expiry=datetime.now(timezone.utc) + timedelta(minutes=expiry_minutes),
+            **signing_kwargs,
         )
         return f"{blob_client.url}?{sas_token}"
 
+    async def _ensure_user_delegation_key(self, blob_service_client: BlobServiceClient) -> None:
+        """Fetch or refresh the cached user delegation key used to sign SAS URLs without an account key.
+
+        The key is requested once and reused for every blob; it is renewed only when it would
+        expire before a freshly signed SAS URL does.
+        """
+        if self.storage_account_key:
+            return
+        async with self._user_delegation_key_lock:
+            now = datetime.now(timezone.utc)
+            refresh_margin = timedelta(minutes=self.SAS_EXPIRY_MINUTES + 15)
+            if self._user_delegation_key and self._user_delegation_key_expiry - now > refresh_margin:
+                return
+            key_start = now - timedelta(minutes=5)
+            key_expiry = now + timedelta(hours=max(self.delegation_key_hours, 2))
+            try:
+                self._user_delegation_key = await blob_service_client.get_user_delegation_key(
+                    key_start_time=key_start,
+                    key_expiry_time=key_expiry,
+                )
+            except Exception as exc:
+                logging.error("Unable to obtain user delegation key: %s", exc)
+                return
+            self._user_delegation_key_expiry = key_expiry
+            logging.info("User delegation key refreshed; valid until %s", key_expiry.isoformat())
+
     def _build_speech_transcription_url(self) -> str | None:
         base = os.getenv("AI_SPEECH_URL", "").rstrip("/")
         if not base:
@@ -426,6 +682,15 @@ class BlobTranscriptionProcessor:
         api_version = os.getenv("AI_SPEECH_API_VERSION", "2025-10-15")
         return f"{base}/speechtotext/v3.2/transcriptions?api-version={api_version}"
 
+    def _needs_language_identification(self, transcript: dict | None, locales: list[str]) -> bool:
+        if len(locales) != 1 or locales == self.locale_stats.candidate_locales:
+            return False
+        # Empty or silent calls would come back just as empty, so identification only adds cost.
+        if not transcript or not transcript.get("phrases") or not transcript.get("duration_ticks"):
+            return False
+        confidence = transcript.get("confidence")
+        return confidence is not None and confidence < self.locale_stats.min_confidence
+
     def _build_batch_transcription_payload(self, file_name: str, sas_url: str, locales: list[str] = ["en-US", "es-MX"]) -> dict:
         profanity_mode = os.getenv("SPEECH_PROFANITY_MODE", "Masked")
         word_timestamps = os.getenv("SPEECH_WORD_TIMESTAMPS", "true").lower() in {"true", "1", "yes"}
@@ -447,42 +712,194 @@ class BlobTranscriptionProcessor:
         return payload
 
     async def _poll_transcription_job(self, client: httpx.AsyncClient, job_url: str, headers: dict[str, str], timeout_seconds: int = 900, poll_interval: int = 5):
+        # Time up to the last poll that still saw NotStarted counts as queue wait, the rest as recognition.
         deadline = time.time() + timeout_seconds
+        started = queued_until = time.perf_counter()
         while time.time() < deadline:
             response = await client.get(job_url, headers=headers)
             response.raise_for_status()
             job_data = response.json()
             status = job_data.get("status")
+            if status == "NotStarted":
+                queued_until = time.perf_counter()
             if status in {"Succeeded", "Failed"}:
+                add_stage("queue_wait", queued_until - started)
+                add_stage("recognition", time.perf_counter() - queued_until)
                 return job_data
             await asyncio.sleep(poll_interval)
         logging.error("Speech batch job at %s timed out after %s seconds", job_url, timeout_seconds)
         return {"status": "Failed", "error": {"message": "timeout"}}
 
-    async def _download_batch_transcript(self, client: httpx.AsyncClient, job_data: dict, headers: dict[str, str]) -> str | None:
+    async def _transcribe_in_segments(
+        self,
+        client: httpx.AsyncClient,
+        speech_url: str,
+        headers: dict[str, str],
+        blob_client: BlobClient,
+        file_name: str,
+        file_data: io.BytesIO,
+        locales: list[str],
+    ) -> dict:
+        """Transcribe an over-length file as concurrent segments and stitch the phrases back together.
+
+        Segments are uploaded under a per-run prefix of the scratch container and deleted
+        afterwards. Any failure falls back to the manual-processing marker.
+        """
+        try:
+            segments = split_audio(
+                file_name,
+                file_data.getvalue(),
+                self.segment_seconds,
+                self.segment_overlap_seconds,
+                self.segment_search_seconds,
+            )
+        except (wave.Error, EOFError, ValueError) as exc:
+            logging.warning("Unable to read %s for splitting (%s). Manual processing required.", file_name, exc)
+            return {"text": self.TOO_LONG_TEXT}
+        if len(segments) < 2:
+            logging.warning("Unable to split %s into segments. Manual processing required.", file_name)
+            return {"text": self.TOO_LONG_TEXT}
+        logging.info("Split %s into %s segments", file_name, len(segments))
+
+        scratch_prefix = f"{os.path.splitext(blob_client.blob_name)[0]}/{uuid.uuid4().hex}"
+        async with self._get_blob_service_client() as blob_service_client:
+            scratch_client = blob_service_client.get_container_client(self.scratch_container)
+            try:
+                await scratch_client.create_container()
+            except ResourceExistsError:
+                pass
+
+            segment_clients = [
+                scratch_client.get_blob_client(f"{scratch_prefix}/part-{segment.index:03d}{segment.extension}")
+                for segment in segments
+            ]
+
+            async def transcribe_segment(segment_client: BlobClient, data: bytes) -> dict:
+                await segment_client.upload_blob(data, overwrite=True)
+                sas_url = self._generate_blob_sas_url(segment_client)
+                if not sas_url:
+                    raise RuntimeError("sas_generation_failed")
+                payload = self._build_batch_transcription_payload(segment_client.blob_name, sas_url, locales)
+                job_result = await self._submit_batch_job(client, speech_url, headers, payload)
+                if not job_result or job_result.get("status") != "Succeeded":
+                    raise RuntimeError(f"segment {segment_client.blob_name} failed: {job_result}")
+                return await self._fetch_transcript_payload(client, job_result, headers) or {}
+
+            try:
+                payloads = await asyncio.gather(
+                    *(
+                        transcribe_segment(segment_client, segment.data)
+                        for segment_client, segment in zip(segment_clients, segments)
+                    )
+                )
+            except Exception as exc:
+                logging.error("Segmented transcription failed for %s: %s", file_name, exc)
+                return {"text": self.TOO_LONG_TEXT}
+            finally:
+                for segment_client in segment_clients:
+                    try:
+                        await segment_client.delete_blob()
+                    except Exception as exc:
+                        logging.warning("Unable to delete scratch segment %s: %s", segment_client.blob_name, exc)
+
+        transcript = self._transcript_from_payload(merge_segment_transcripts(segments, payloads))
+        if not transcript:
+            return self._short_call_result("empty_transcript")
+        return {
+            "text": transcript["text"],
+            "locale": transcript.get("locale"),
+            "locale_confidence": transcript.get("confidence"),
+            "segments": len(segments),
+        }
+
+    async def _submit_batch_job(
+        self, client: httpx.AsyncClient, speech_url: str, headers: dict[str, str], payload: dict
+    ) -> dict | None:
+        """Submit a batch job through the circuit breaker and poll it to completion.
+
+        Every submission settles the breaker: transient HTTP and network errors count as
+        failures, any other HTTP answer as success, and other errors (including cancellation)
+        give the probe slot back. Callers must not record the submission outcome again.
+        """
+        with stage("breaker_wait"):
+            await self.circuit_breaker.acquire()
+        try:
+            with stage("submit"):
+                response = await client.post(speech_url, headers=headers, json=payload)
+            response.raise_for_status()
+        except httpx.NetworkError:
+            self.circuit_breaker.record_failure()
+            raise
+        except httpx.HTTPStatusError as exc:
+            if exc.response is not None and exc.response.status_code in self.RETRYABLE_STATUS_CODES:
+                self.circuit_breaker.record_failure()
+            else:
+                self.circuit_breaker.record_success()
+            raise
+        except BaseException:
+            self.circuit_breaker.release()
+            raise
+        self.circuit_breaker.record_success()
+        job_location = response.headers.get("Location") or response.headers.get("location")
+        if not job_location:
+            return None
+        return await self._poll_transcription_job(client, job_location, headers)
+
+    async def _download_batch_transcript(self, client: httpx.AsyncClient, job_data: dict, headers: dict[str, str]) -> dict | None:
+        transcript_payload = await self._fetch_transcript_payload(client, job_data, headers)
+        if not transcript_payload:
+            return None
+        with stage("transcript_download"):
+            return self._transcript_from_payload(transcript_payload)
+
+    def _transcript_from_payload(self, transcript_payload: dict) -> dict | None:
+        combined_phrases = transcript_payload.get("combinedRecognizedPhrases") or []
+        text_segments = [phrase.get("display", "").strip() for phrase in combined_phrases if phrase.get("display")]
+        if not text_segments:
+            return None
+        return {"text": " ".join(text_segments), **self._summarize_locale(transcript_payload)}
+
+    async def _fetch_transcript_payload(self, client: httpx.AsyncClient, job_data: dict, headers: dict[str, str]) -> dict | None:
         files_url = job_data.get("links", {}).get("files")
         if not files_url:
             logging.error("Speech batch job does not contain files link")
             return None
 
-        files_response = await client.get(files_url, headers=headers)
-        files_response.raise_for_status()
-        files_payload = files_response.json()
+        with stage("files_listing"):
+            files_response = await client.get(files_url, headers=headers)
+            files_response.raise_for_status()
+            files_payload = files_response.json()
         for file_info in files_payload.get("values", []):
             if file_info.get("kind", "").lower() != "transcription":
                 continue
             content_url = file_info.get("links", {}).get("contentUrl") or file_info.get("contentUrl")
             if not content_url:
                 continue
-            transcript_response = await client.get(content_url)
-            transcript_response.raise_for_status()
-            transcript_payload = transcript_response.json()
-            combined_phrases = transcript_payload.get("combinedRecognizedPhrases") or []
-            text_segments = [phrase.get("display", "").strip() for phrase in combined_phrases if phrase.get("display")]
-            if text_segments:
-                return " ".join(text_segments)
+            with stage("transcript_download"):
+                transcript_response = await client.get(content_url)
+                transcript_response.raise_for_status()
+                return transcript_response.json()
         return None
 
+    def _summarize_locale(self, transcript_payload: dict) -> dict:
+        """Return the duration-weighted dominant locale and mean phrase confidence of a transcript."""
+        locale_durations: dict[str, int] = {}
+        confidences = []
+        phrases = transcript_payload.get("recognizedPhrases") or []
+        for phrase in phrases:
+            locale = phrase.get("locale")
+            if locale:
+                locale_durations[locale] = locale_durations.get(locale, 0) + (phrase.get("durationInTicks") or 1)
+            best = (phrase.get("nBest") or [{}])[0]
+            if best.get("confidence") is not None:
+                confidences.append(best["confidence"])
+        return {
+            "locale": max(locale_durations, key=locale_durations.get) if locale_durations else None,
+            "confidence": sum(confidences) / len(confidences) if confidences else None,
+            "phrases": len(phrases),
+            "duration_ticks": sum(phrase.get("durationInTicks") or 0 for phrase in phrases),
+        }
+
     async def save_transcription(
         self,
         blob_name: str,
@@ -544,6 +961,7 @@ class BlobTranscriptionProcessor:
             else:
                 await container.create_item(manager.model_dump())
 
+        query_cache.invalidate()
         logging.info("Transcription saved at: %s", transcription.id)
 
     def _should_use_aad_auth(self) -> bool:
@@ -552,15 +970,54 @@ class BlobTranscriptionProcessor:
             return flag.lower() in {"1", "true", "yes"}
         return not bool(self.cosmos_key)
 
+    def _get_aad_credential(self) -> DefaultAzureCredential:
+        if not self._aad_credential:
+            self._aad_credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
+        return self._aad_credential
+
     def _get_cosmos_client(self):
         if self.use_aad_auth:
-            if not self._aad_credential:
-                self._aad_credential = DefaultAzureCredential(exclude_interactive_browser_credential=True)
-            return CosmosClient(self.cosmos_endpoint, credential=self._aad_credential)
+            return CosmosClient(self.cosmos_endpoint, credential=self._get_aad_credential())
         if not self.cosmos_key:
             raise RuntimeError("COSMOS_KEY is empty and AAD auth is disabled. Set COSMOS_USE_AAD=true or provide a key.")
         return CosmosClient(self.cosmos_endpoint, self.cosmos_key)
 
+    def _get_change_feed_client(self) -> ChangeFeedClient:
+        if self.storage_account_key:
+            return ChangeFeedClient.from_connection_string(self.storage_connection_string)
+        account_url = self.storage_account_url or f"https://{self.storage_account_name}.blob.core.windows.net"
+        return ChangeFeedClient(account_url, credential=self._get_sync_aad_credential())
+
+    def _get_sync_aad_credential(self) -> SyncDefaultAzureCredential:
+        # The change feed client is synchronous, so it needs its own (sync) credential.
+        if not self._sync_aad_credential:
+            self._sync_aad_credential = SyncDefaultAzureCredential(exclude_interactive_browser_credential=True)
+        return self._sync_aad_credential
+
+    def _get_blob_service_client(self) -> BlobServiceClient:
+        if self.storage_account_key:
+            return BlobServiceClient.from_connection_string(self.storage_connection_string)
+        account_url = self.storage_account_url
+        if not account_url and self.storage_account_name:
+            account_url = f"https://{self.storage_account_name}.blob.core.windows.net"
+        if not account_url:
+            raise RuntimeError(
+                "AZURE_STORAGE_CONNECTION_STRING has no AccountKey. Set AZURE_STORAGE_ACCOUNT_URL or"
+                " AZURE_STORAGE_ACCOUNT_NAME to use AAD auth against the storage account."
+            )
+        return BlobServiceClient(account_url, credential=self._get_aad_credential())
+
+async def _iter_pages(items, page_size: int):
+    """Group an async iterator into lists of up to ``page_size`` items."""
+    page = []
+    async for item in items:
+        page.append(item)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
 
 def _get_env_bool(name: str, default: bool) -> bool:
     value = os.getenv(name)
@@ -592,6 +1049,7 @@ def _build_params_from_env() -> TranscriptionJobParams:
         run_evaluation_flow=_get_env_bool("TRANSCRIPTION_EVAL_FLOW", True),
         semaphores=_get_env_int("TRANSCRIPTION_SEMAPHORES", 10),
         results_per_page=_get_env_int("TRANSCRIPTION_RESULTS_PER_PAGE", 50),
+        incremental=_get_env_bool("TRANSCRIPTION_INCREMENTAL", False),
     )
 
 
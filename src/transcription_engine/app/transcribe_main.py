@@ -67,6 +67,12 @@ def build_parser() -> argparse.ArgumentParser:
         default=False,
         help="Skip blobs that already have a transcription in the destination container.",
     )
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        default=False,
+        help="Only discover blobs created since the last successful run (change feed or last_modified watermark).",
+    )
     parser.add_argument(
         "--run-evaluation-flow",
         action=argparse.BooleanOptionalAction,
@@ -91,6 +97,7 @@ def main():
         run_evaluation_flow=args.run_evaluation_flow,
         semaphores=args.semaphores,
         results_per_page=args.results_per_page,
+        incremental=args.incremental,
     )
 
     processor = BlobTranscriptionProcessor()